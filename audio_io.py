@@ -0,0 +1,298 @@
+from pathlib import Path
+from typing import Optional
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+AUDIO_BACKEND = os.environ.get("AUDIOCART_AUDIO_BACKEND", "sounddevice")
+AUDIO_INPUT = os.environ.get("AUDIOCART_AUDIO_INPUT")
+AUDIO_OUTPUT = os.environ.get("AUDIOCART_AUDIO_OUTPUT")
+AUDIO_LATENCY = os.environ.get("AUDIOCART_LATENCY")
+
+
+def parse_latency(value):
+    # PortAudio accepts 'low', 'high' or a suggested latency in seconds; None keeps the device default.
+    if value is None or value in ("low", "high"):
+        return value
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = 0.0
+    if not 0 < seconds <= 1:
+        raise ValueError(f"latency must be 'low', 'high' or seconds in (0, 1]: {value}")
+    return seconds
+
+
+class SoundDeviceBackend:
+    name = "sounddevice"
+
+    def __init__(self, sample_rate, block_size):
+        import sounddevice as sd
+        self.sd = sd
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.latency = parse_latency(AUDIO_LATENCY)
+        self.device_list = None
+        self.selected = None
+        self.stream = None
+        self.monitor_stream = None
+
+    def devices(self, refresh=False) -> list:
+        # PortAudio scans are slow; the list only changes on explicit refresh.
+        if self.device_list is None or refresh:
+            self.device_list = [{
+                "id": i, "name": device['name'],
+                "max_input_channels": device['max_input_channels'],
+                "max_output_channels": device['max_output_channels']
+            } for i, device in enumerate(self.sd.query_devices())]
+        return self.device_list
+
+    def find_devices(self):
+        devices = self.devices(refresh=True)
+        print("\n🎤 Доступные аудио устройства:")
+        print("=" * 80)
+
+        for device in devices:
+            device_type = []
+            if device['max_input_channels'] > 0:
+                device_type.append("INPUT")
+            if device['max_output_channels'] > 0:
+                device_type.append("OUTPUT")
+
+            print(f"{device['id']}: {device['name']}")
+            print(f"   Тип: {', '.join(device_type)}")
+            print(f"   Каналов: IN={device['max_input_channels']}, OUT={device['max_output_channels']}")
+            print()
+
+        input_device = None
+        output_device = None
+        monitor_device = None
+
+        for device in devices:
+            name_lower = device['name'].lower()
+            virtual = 'virtual' in name_lower or 'cable' in name_lower
+            if device['max_input_channels'] > 0 and not virtual and input_device is None:
+                input_device = device['id']
+                print(f"✅ Найден микрофон: {device['name']}")
+            if device['max_output_channels'] > 0 and virtual and output_device is None:
+                output_device = device['id']
+                print(f"✅ Найден Virtual Cable: {device['name']}")
+            if device['max_output_channels'] > 0 and not virtual and monitor_device is None:
+                monitor_device = device['id']
+
+        if input_device is None:
+            input_device = self.sd.default.device[0]
+            print(f"⚠️  Используется микрофон по умолчанию")
+
+        if output_device is None:
+            output_device = self.sd.default.device[1]
+            print(f"⚠️  Virtual Cable не найден, используется устройство по умолчанию")
+            print(f"   Установите VB-Audio Virtual Cable: https://vb-audio.com/Cable/")
+
+        print("=" * 80)
+        print(f"\n🎙️  Вход (микрофон): устройство #{input_device}")
+        print(f"🔊 Выход (Virtual Cable): устройство #{output_device}")
+        if monitor_device is not None:
+            print(f"🎧 Мониторинг на: {devices[monitor_device]['name']}")
+        print()
+
+        return input_device, output_device, monitor_device
+
+    def start(self, callback, monitor_callback):
+        if self.stream is not None:
+            return
+        if self.selected is None:
+            self.selected = self.find_devices()
+        input_device, output_device, monitor_device = self.selected
+        self.stream = self.sd.Stream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            device=(input_device, output_device),
+            channels=2,
+            callback=callback,
+            dtype='float32',
+            latency=self.latency
+        )
+        self.stream.start()
+
+        if monitor_device is not None:
+            self.monitor_stream = self.sd.OutputStream(
+                samplerate=self.sample_rate,
+                blocksize=self.block_size,
+                device=monitor_device,
+                channels=2,
+                callback=monitor_callback,
+                dtype='float32',
+                latency=self.latency
+            )
+            self.monitor_stream.start()
+
+    def device_latency(self) -> float:
+        if self.stream is None:
+            return 0.0
+        return float(sum(self.stream.latency))
+
+    def stop(self):
+        for stream in (self.stream, self.monitor_stream):
+            if stream is not None:
+                stream.stop()
+                stream.close()
+        self.stream = None
+        self.monitor_stream = None
+
+    def halt(self):
+        self.stop()
+
+
+class ClockStatus:
+    # Mirrors sounddevice.CallbackFlags closely enough for AudioMetrics.observe_status.
+    input_underflow = False
+    input_overflow = False
+    output_overflow = False
+    priming_output = False
+
+    def __init__(self, output_underflow=False):
+        self.output_underflow = output_underflow
+
+    def __bool__(self):
+        return self.output_underflow
+
+
+class NullBackend:
+    # Drives the callbacks from a wall-clock thread at the real block cadence, without audio hardware.
+    # A tick that starts more than one block late is reported as an output underflow.
+    name = "null"
+
+    def __init__(self, sample_rate, block_size):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.latency = None
+        self.thread = None
+        self.halted = threading.Event()
+        self.halted.set()
+        self.blocks = 0
+        self.late_blocks = 0
+
+    def devices(self, refresh=False) -> list:
+        return [{"id": 0, "name": f"{self.name} (clock)", "max_input_channels": 2, "max_output_channels": 2}]
+
+    def device_latency(self) -> float:
+        return 0.0
+
+    def read_input(self, indata):
+        indata.fill(0)
+
+    def write_output(self, outdata):
+        pass
+
+    def close_files(self):
+        pass
+
+    def start(self, callback, monitor_callback):
+        if self.thread is not None and not self.halted.is_set():
+            return
+        # Each run gets its own stop event and buffers, so a clock thread that outlives halt()'s
+        # join can never be revived by, or share buffers with, the next run.
+        self.halted = threading.Event()
+        self.indata = np.zeros((self.block_size, 2), dtype=np.float32)
+        self.outdata = np.zeros((self.block_size, 2), dtype=np.float32)
+        self.monitor_out = np.zeros((self.block_size, 2), dtype=np.float32)
+        self.thread = threading.Thread(target=self._run, args=(callback, monitor_callback, self.halted),
+                                       daemon=True, name=f"{self.name}-audio")
+        self.thread.start()
+        print(f"✅ {self.name} audio backend: {self.block_size} samples @ {self.sample_rate}Hz")
+
+    def _run(self, callback, monitor_callback, halted):
+        indata, outdata, monitor_out = self.indata, self.outdata, self.monitor_out
+        block_size = len(indata)
+        period = block_size / self.sample_rate
+        deadline = time.perf_counter()
+        while not halted.is_set():
+            late = time.perf_counter() - deadline > period
+            if late:
+                self.late_blocks += 1
+                deadline = time.perf_counter()
+            self.read_input(indata)
+            callback(indata, outdata, block_size, None, ClockStatus(late))
+            if halted.is_set():
+                break
+            self.write_output(outdata)
+            monitor_callback(monitor_out, block_size, None, ClockStatus())
+            self.blocks += 1
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def halt(self):
+        # Stops the clock but keeps output files open, so the stream can restart with a new block size.
+        self.halted.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            if not self.thread.is_alive():
+                self.thread = None
+
+    def stop(self):
+        self.halt()
+        self.close_files()
+
+
+class FileBackend(NullBackend):
+    # Plays a sound file into the processor (looping) and records the processed output as 16-bit WAV.
+    name = "file"
+
+    def __init__(self, sample_rate, block_size, input_path: Optional[str] = AUDIO_INPUT,
+                 output_path: Optional[str] = AUDIO_OUTPUT):
+        super().__init__(sample_rate, block_size)
+        self.source = np.zeros(block_size, dtype=np.float32)
+        if input_path:
+            from soundpad import decode_sound
+            self.source = decode_sound(Path(input_path))
+            if len(self.source) == 0:
+                self.source = np.zeros(block_size, dtype=np.float32)
+        self.position = 0
+        self.writer = None
+        if output_path:
+            self.writer = wave.open(str(output_path), "wb")
+            self.writer.setnchannels(1)
+            self.writer.setsampwidth(2)
+            self.writer.setframerate(sample_rate)
+
+    def read_input(self, indata):
+        filled = 0
+        while filled < len(indata):
+            count = min(len(indata) - filled, len(self.source) - self.position)
+            indata[filled:filled + count, 0] = self.source[self.position:self.position + count]
+            filled += count
+            self.position = (self.position + count) % len(self.source)
+        indata[:, 1] = indata[:, 0]
+
+    def write_output(self, outdata):
+        if self.writer is not None:
+            self.writer.writeframes((np.clip(outdata[:, 0], -1.0, 1.0) * 32767).astype('<i2').tobytes())
+
+    def close_files(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+AUDIO_BACKENDS = {
+    "sounddevice": SoundDeviceBackend,
+    "null": NullBackend,
+    "file": FileBackend,
+}
+
+
+def create_backend(sample_rate, block_size, name=AUDIO_BACKEND):
+    backend = AUDIO_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown audio backend '{name}'. Available: {', '.join(AUDIO_BACKENDS)}")
+    try:
+        return backend(sample_rate, block_size)
+    except (ImportError, OSError) as e:
+        print(f"❌ Audio backend '{name}' unavailable ({e}); falling back to 'null'")
+        return NullBackend(sample_rate, block_size)
@@ -0,0 +1,209 @@
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+
+from effects import FRONT_END
+from impulses import impulse_store
+from multichannel import MultiChannelProcessor
+from processor import AudioProcessor, BLOCK_SIZES, SAMPLE_RATE, OUTPUT_LIMIT, EFFECTS
+
+IR_SECONDS = (1, 3, 6)
+CONVOLUTION_EFFECTS = tuple(f"convolution_{s}s" for s in IR_SECONDS)
+
+
+def synthetic_input(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / SAMPLE_RATE
+    voice = 0.2 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return (voice + 0.02 * rng.standard_normal(num_samples)).astype(np.float32)
+
+
+def synthetic_ir(seconds, seed=2):
+    rng = np.random.default_rng(seed)
+    num_samples = int(seconds * SAMPLE_RATE)
+    decay = np.exp(-6.9 * np.arange(num_samples) / num_samples)
+    return rng.standard_normal(num_samples) * decay
+
+
+def _select_effect(processor, effect):
+    if effect in CONVOLUTION_EFFECTS:
+        ir_id = f"bench_{effect}"
+        if impulse_store.get(ir_id) is None:
+            impulse_store.register(ir_id, synthetic_ir(float(effect[len("convolution_"):-1])))
+        processor.define_chain(effect, FRONT_END + [{"type": "convolution", "ir": ir_id}])
+    processor.set_effect(effect)
+
+
+def bench_case(effect, block_size, soundpad=False, seconds=2.0, warmup=8):
+    processor = AudioProcessor(block_size=block_size)
+    _select_effect(processor, effect)
+    if soundpad:
+        processor.play_sound(synthetic_input(SAMPLE_RATE * 5, seed=1), loop=True)
+
+    num_blocks = max(int(seconds * SAMPLE_RATE / block_size), 16)
+    source = synthetic_input(block_size * 64)
+    blocks = source.reshape(64, block_size)
+
+    for i in range(warmup):
+        processed = processor.process(blocks[i % 64])
+        np.clip(processed, -OUTPUT_LIMIT, OUTPUT_LIMIT, out=processed)
+
+    times = np.empty(num_blocks)
+    for i in range(num_blocks):
+        started = time.perf_counter()
+        processed = processor.process(blocks[i % 64])
+        np.clip(processed, -OUTPUT_LIMIT, OUTPUT_LIMIT, out=processed)
+        times[i] = time.perf_counter() - started
+
+    budget = block_size / SAMPLE_RATE
+    return {
+        "effect": effect,
+        "block_size": block_size,
+        "soundpad": soundpad,
+        "blocks": num_blocks,
+        "budget_ms": budget * 1000,
+        "mean_ms": float(times.mean() * 1000),
+        "p99_ms": float(np.percentile(times, 99) * 1000),
+        "max_ms": float(times.max() * 1000),
+        "realtime_factor": float(budget / times.mean()),
+        "deadline_misses": int(np.count_nonzero(times > budget))
+    }
+
+
+def run_suite(effects=EFFECTS + CONVOLUTION_EFFECTS, block_sizes=BLOCK_SIZES, seconds=2.0):
+    results = []
+    for effect in effects:
+        for block_size in block_sizes:
+            for soundpad in (False, True):
+                results.append(bench_case(effect, block_size, soundpad, seconds))
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }
+
+
+def bench_channels(channels, effect, block_size, seconds=2.0, warmup=8):
+    # The same input block through N AudioProcessors vs one MultiChannelProcessor with N rows.
+    num_blocks = max(int(seconds * SAMPLE_RATE / block_size), 16)
+    blocks = np.stack([synthetic_input(block_size * 8, seed=i).reshape(8, block_size) for i in range(channels)], axis=1)
+
+    singles = [AudioProcessor(block_size=block_size) for _ in range(channels)]
+    for processor in singles:
+        processor.set_effect(effect)
+    batched = MultiChannelProcessor(channels, block_size=block_size)
+    for channel in range(channels):
+        batched.set_effect(channel, effect)
+
+    def run_singles(block):
+        for processor, row in zip(singles, block):
+            processor.process(row)
+
+    timings = {}
+    for name, step in (("separate", run_singles), ("batched", batched.process)):
+        for i in range(warmup):
+            step(blocks[i % 8])
+        started = time.perf_counter()
+        for i in range(num_blocks):
+            step(blocks[i % 8])
+        timings[name] = (time.perf_counter() - started) / num_blocks
+    return {
+        "effect": effect,
+        "channels": channels,
+        "block_size": block_size,
+        "budget_ms": block_size / SAMPLE_RATE * 1000,
+        "separate_ms": timings["separate"] * 1000,
+        "batched_ms": timings["batched"] * 1000,
+        "separate_per_channel_ms": timings["separate"] * 1000 / channels,
+        "batched_per_channel_ms": timings["batched"] * 1000 / channels,
+        "speedup": timings["separate"] / timings["batched"]
+    }
+
+
+def _print_channels(results):
+    print(f"{'effect':<12}{'chans':>7}{'block':>7}{'budget':>9}{'separate':>10}{'batched':>9}{'per-ch':>9}{'speedup':>9}")
+    for r in results:
+        print(f"{r['effect']:<12}{r['channels']:>7}{r['block_size']:>7}{r['budget_ms']:>9.3f}"
+              f"{r['separate_ms']:>10.3f}{r['batched_ms']:>9.3f}{r['batched_per_channel_ms']:>9.3f}{r['speedup']:>8.1f}x")
+
+
+def _case_key(result):
+    return (result["effect"], result["block_size"], result["soundpad"])
+
+
+def compare(report, baseline, tolerance=0.2):
+    previous = {_case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(_case_key(result))
+        if old and result["mean_ms"] > old["mean_ms"] * (1 + tolerance):
+            regressions.append({
+                "effect": result["effect"],
+                "block_size": result["block_size"],
+                "soundpad": result["soundpad"],
+                "baseline_mean_ms": old["mean_ms"],
+                "mean_ms": result["mean_ms"]
+            })
+    return regressions
+
+
+def _print_table(report):
+    print(f"{'effect':<12}{'block':>7}{'pad':>5}{'budget':>9}{'mean':>9}{'p99':>9}{'max':>9}{'RTF':>9}")
+    for r in report["results"]:
+        flag = " ⚠️" if r["max_ms"] > r["budget_ms"] else ""
+        print(f"{r['effect']:<12}{r['block_size']:>7}{'yes' if r['soundpad'] else 'no':>5}"
+              f"{r['budget_ms']:>9.3f}{r['mean_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['max_ms']:>9.3f}"
+              f"{r['realtime_factor']:>9.1f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AudioProcessor effects against the block deadline")
+    parser.add_argument("--effects", nargs="+", default=list(EFFECTS + CONVOLUTION_EFFECTS),
+                        choices=EFFECTS + CONVOLUTION_EFFECTS)
+    parser.add_argument("--block-sizes", nargs="+", type=int, default=list(BLOCK_SIZES))
+    parser.add_argument("--seconds", type=float, default=2.0, help="audio duration per case")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed mean slowdown vs baseline")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of a table")
+    parser.add_argument("--channels", nargs="+", type=int,
+                        help="compare N separate processors with one MultiChannelProcessor instead")
+    args = parser.parse_args(argv)
+
+    if args.channels:
+        effects = [e for e in args.effects if e in EFFECTS]
+        results = [bench_channels(channels, effect, block_size, args.seconds)
+                   for effect in effects for channels in args.channels for block_size in args.block_sizes]
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            _print_channels(results)
+        return 0
+
+    report = run_suite(args.effects, args.block_sizes, args.seconds)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(report)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"[Bench] ❌ {r['effect']} block={r['block_size']} soundpad={r['soundpad']}: "
+                  f"{r['baseline_mean_ms']:.3f}ms -> {r['mean_ms']:.3f}ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,27 @@
+from collections import deque
+
+
+class CommandQueue:
+    # Single producer (the event loop) and single consumer (the audio thread).
+    # deque.append/popleft are atomic in CPython, so neither side ever blocks.
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.items = deque()
+        self.dropped = 0
+
+    def put(self, command) -> bool:
+        if len(self.items) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.items.append(command)
+        return True
+
+    def get(self):
+        try:
+            return self.items.popleft()
+        except IndexError:
+            return None
+
+    def __len__(self):
+        return len(self.items)
+
@@ -0,0 +1,542 @@
+from functools import lru_cache
+from math import gcd
+import threading
+
+import numpy as np
+from scipy import signal
+
+
+class CombFilter:
+    def __init__(self, delay, gain, dtype=np.float64):
+        self.delay = delay
+        self.gain = gain
+        self.buffer = np.zeros(delay, dtype=dtype)
+        self.ptr = 0
+
+    def reset(self):
+        self.buffer.fill(0)
+        self.ptr = 0
+
+    def process(self, audio_data, out):
+        # Feedback comb y[n] = w[n - D], w[n] = x[n] + g * y[n].
+        # Slices never exceed the delay, so every read sample was written in an earlier slice.
+        num_samples = len(audio_data)
+        pos = 0
+        while pos < num_samples:
+            n = min(self.delay - self.ptr, num_samples - pos)
+            delayed = self.buffer[self.ptr:self.ptr + n]
+            out[pos:pos + n] += delayed
+            delayed *= self.gain
+            delayed += audio_data[pos:pos + n]
+            self.ptr = (self.ptr + n) % self.delay
+            pos += n
+        return out
+
+
+class CombReverb:
+    def __init__(self, delays, gain=0.7, mix=0.5, dtype=np.float64):
+        self.combs = [CombFilter(d, gain, dtype) for d in delays]
+        self.mix = mix
+        self.wet = np.zeros(0, dtype=dtype)
+
+    def prepare(self, block_size):
+        self.wet = np.zeros(block_size, dtype=self.wet.dtype)
+
+    def reset(self):
+        for comb in self.combs:
+            comb.reset()
+
+    def process(self, audio_data, out=None):
+        # out may alias audio_data; the combs read the dry signal before it is overwritten.
+        if out is None:
+            out = np.empty_like(audio_data)
+        if len(self.wet) != len(audio_data):
+            self.wet = np.zeros(len(audio_data), dtype=self.wet.dtype)
+        wet = self.wet
+        wet.fill(0)
+        for comb in self.combs:
+            comb.process(audio_data, wet)
+        wet /= len(self.combs)
+        wet *= self.mix
+        np.multiply(audio_data, 1 - self.mix, out=out)
+        out += wet
+        return out
+
+
+class DelayLine:
+    def __init__(self, max_delay, delay, feedback, dtype=np.float64):
+        self.buffer = np.zeros(max_delay, dtype=dtype)
+        self.scratch = np.zeros(0, dtype=dtype)
+        self.ptr = 0
+        self.delay = 1
+        self.feedback = feedback
+        self.set_delay(delay)
+
+    def set_delay(self, delay):
+        self.delay = max(1, min(int(delay), len(self.buffer)))
+
+    def prepare(self, block_size):
+        self.scratch = np.zeros(block_size, dtype=self.buffer.dtype)
+
+    def reset(self):
+        self.buffer.fill(0)
+        self.ptr = 0
+
+    def _read(self, start, out):
+        n = len(out)
+        first = min(n, len(self.buffer) - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:] = self.buffer[:n - first]
+
+    def _write(self, start, data):
+        n = len(data)
+        first = min(n, len(self.buffer) - start)
+        self.buffer[start:start + first] = data[:first]
+        self.buffer[:n - first] = data[first:]
+
+    def process(self, audio_data, out=None):
+        # y[n] = x[n] + fb * y[n - D]; a slice of at most D samples only reads already written output.
+        # out may alias audio_data: each slice is read before it is overwritten.
+        num_samples = len(audio_data)
+        size = len(self.buffer)
+        if out is None:
+            out = np.empty_like(audio_data)
+        if len(self.scratch) < min(self.delay, num_samples):
+            self.scratch = np.zeros(num_samples, dtype=self.buffer.dtype)
+        pos = 0
+        while pos < num_samples:
+            n = min(self.delay, num_samples - pos)
+            delayed = self.scratch[:n]
+            self._read((self.ptr - self.delay) % size, delayed)
+            delayed *= self.feedback
+            delayed += audio_data[pos:pos + n]
+            self._write(self.ptr, delayed)
+            out[pos:pos + n] = delayed
+            self.ptr = (self.ptr + n) % size
+            pos += n
+        return out
+
+
+class PCMStream:
+    # A sound that is still being resampled: voices play up to `ready` and hold at that edge
+    # until `done`, so playback starts with the first chunk instead of the last.
+    def __init__(self, length):
+        self.data = np.zeros(length, dtype=np.float32)
+        self.ready = 0
+        self.done = threading.Event()
+
+    def __len__(self):
+        return len(self.data)
+
+    def write(self, chunk):
+        end = min(self.ready + len(chunk), len(self.data))
+        self.data[self.ready:end] = chunk[:end - self.ready]
+        self.ready = end
+
+    def close(self):
+        self.data = self.data[:self.ready]
+        self.done.set()
+
+
+class VoicePool:
+    def __init__(self, max_voices=32, block_size=4096):
+        self.max_voices = max_voices
+        self.buffers = [None] * max_voices
+        self.streams = [None] * max_voices
+        self.sound_ids = [None] * max_voices
+        self.voice_ids = np.zeros(max_voices, dtype=np.int64)
+        self.positions = np.zeros(max_voices, dtype=np.int64)
+        self.gains = np.zeros(max_voices, dtype=np.float32)
+        self.volumes = np.ones(max_voices, dtype=np.float32)
+        self.loops = np.zeros(max_voices, dtype=bool)
+        self.active = np.zeros(max_voices, dtype=bool)
+        self.scratch = np.zeros(block_size, dtype=np.float32)
+        self.next_voice_id = 1
+        self.steals = 0
+
+    def prepare(self, block_size):
+        self.scratch = np.zeros(block_size, dtype=np.float32)
+
+    def _find_slot(self):
+        for slot in range(self.max_voices):
+            if not self.active[slot]:
+                return slot
+        # Pool is full: steal the oldest voice, looping voices last.
+        order = np.lexsort((self.voice_ids, self.loops))
+        self.steals += 1
+        return int(order[0])
+
+    def _slot_of(self, voice_id):
+        for slot in range(self.max_voices):
+            if self.active[slot] and self.voice_ids[slot] == voice_id:
+                return slot
+        return None
+
+    def play(self, buffer, gain=1.0, volume=1.0, loop=False, sound_id=None, voice_id=None):
+        slot = self._find_slot()
+        if voice_id is None:
+            voice_id = self.next_voice_id
+            self.next_voice_id += 1
+        self.active[slot] = False
+        self.buffers[slot] = buffer
+        self.streams[slot] = buffer if isinstance(buffer, PCMStream) else None
+        self.sound_ids[slot] = sound_id
+        self.voice_ids[slot] = voice_id
+        self.positions[slot] = 0
+        self.gains[slot] = gain
+        self.volumes[slot] = volume
+        self.loops[slot] = loop and len(buffer) > 0
+        self.active[slot] = True
+        return voice_id
+
+    def _release(self, slot):
+        self.active[slot] = False
+        self.buffers[slot] = None
+        self.streams[slot] = None
+        self.sound_ids[slot] = None
+
+    def stop(self, voice_id):
+        slot = self._slot_of(voice_id)
+        if slot is None:
+            return False
+        self._release(slot)
+        return True
+
+    def stop_all(self):
+        for slot in range(self.max_voices):
+            self._release(slot)
+
+    def is_playing(self, voice_id):
+        return self._slot_of(voice_id) is not None
+
+    def set_volume(self, voice_id, volume):
+        slot = self._slot_of(voice_id)
+        if slot is None:
+            return False
+        self.volumes[slot] = volume
+        return True
+
+    def active_count(self):
+        return int(np.count_nonzero(self.active))
+
+    def voices(self):
+        result = []
+        for slot in range(self.max_voices):
+            buffer = self.buffers[slot]
+            if self.active[slot] and buffer is not None:
+                result.append({
+                    "voice_id": int(self.voice_ids[slot]),
+                    "sound_id": self.sound_ids[slot],
+                    "position": int(self.positions[slot]),
+                    "length": len(buffer),
+                    "volume": float(self.volumes[slot]),
+                    "loop": bool(self.loops[slot])
+                })
+        return result
+
+    def mix(self, out):
+        # Adds every active voice into out using the preallocated scratch buffer.
+        num_samples = len(out)
+        if len(self.scratch) < num_samples:
+            self.scratch = np.zeros(num_samples, dtype=np.float32)
+        for slot in range(self.max_voices):
+            if not self.active[slot]:
+                continue
+            stream = self.streams[slot]
+            if stream is None:
+                buffer = self.buffers[slot]
+                length = len(buffer)
+                done = True
+            else:
+                # done is read first: once it is set, data and ready are final.
+                done = stream.done.is_set()
+                buffer = stream.data
+                length = stream.ready
+                if done:
+                    self.buffers[slot] = buffer
+                    self.streams[slot] = None
+            pos = int(self.positions[slot])
+            gain = float(self.gains[slot] * self.volumes[slot])
+            filled = 0
+            while filled < num_samples and pos < length:
+                take = min(num_samples - filled, length - pos)
+                scratch = self.scratch[:take]
+                np.multiply(buffer[pos:pos + take], gain, out=scratch)
+                out[filled:filled + take] += scratch
+                filled += take
+                pos += take
+                if pos >= length and done and self.loops[slot]:
+                    pos = 0
+            if pos >= length and done:
+                self._release(slot)
+            else:
+                self.positions[slot] = pos
+        return out
+
+
+def partition_spectra(ir, partition):
+    # Uniform partitions of the IR, each zero-padded to 2P for overlap-save.
+    num_partitions = max(1, -(-len(ir) // partition))
+    padded = np.zeros(num_partitions * partition)
+    padded[:len(ir)] = ir
+    return np.fft.rfft(padded.reshape(num_partitions, partition), n=2 * partition, axis=1)
+
+
+class PartitionedConvolver:
+    def __init__(self, spectra, partition):
+        self.spectra = spectra
+        self.partition = partition
+        num_partitions, bins = spectra.shape
+        self.fdl = np.zeros((num_partitions, bins), dtype=np.complex128)
+        self.products = np.zeros((num_partitions, bins), dtype=np.complex128)
+        self.acc = np.zeros(bins, dtype=np.complex128)
+        self.time_buffer = np.zeros(2 * partition)
+        self.fdl_ptr = 0
+
+    def reset(self):
+        self.fdl.fill(0)
+        self.time_buffer.fill(0)
+        self.fdl_ptr = 0
+
+    def step(self, block, out):
+        # Overlap-save over a frequency-domain delay line: fdl[(ptr + k) % K] is the input
+        # spectrum from k partitions ago and pairs with IR partition k.
+        p = self.partition
+        self.time_buffer[:p] = self.time_buffer[p:]
+        self.time_buffer[p:] = block
+        num_partitions = len(self.fdl)
+        self.fdl_ptr = (self.fdl_ptr - 1) % num_partitions
+        ptr = self.fdl_ptr
+        self.fdl[ptr] = np.fft.rfft(self.time_buffer)
+        tail = num_partitions - ptr
+        np.multiply(self.fdl[ptr:], self.spectra[:tail], out=self.products[:tail])
+        np.multiply(self.fdl[:ptr], self.spectra[tail:], out=self.products[tail:])
+        self.products.sum(axis=0, out=self.acc)
+        out[:] = np.fft.irfft(self.acc, n=2 * p)[p:]
+        return out
+
+
+@lru_cache(maxsize=16)
+def resampler_filter(up, down):
+    # Same anti-aliasing design as scipy.signal.resample_poly, shared by every stream at this ratio.
+    half_len = 10 * max(up, down)
+    h = signal.firwin(2 * half_len + 1, 1.0 / max(up, down), window=("kaiser", 5.0)) * up
+    pad = -half_len % down
+    h = np.concatenate([np.zeros(pad), h])
+    h.flags.writeable = False
+    return h, (half_len + pad) // down
+
+
+class PolyphaseResampler:
+    def __init__(self, from_rate, to_rate, dtype=np.float32):
+        g = gcd(from_rate, to_rate)
+        self.up = to_rate // g
+        self.down = from_rate // g
+        self.h, self.delay = resampler_filter(self.up, self.down)
+        self.dtype = dtype
+        self.buffer = np.zeros(0, dtype=dtype)
+        self.start = 0
+        self.consumed = 0
+        self.produced = 0
+
+    def output_length(self, num_samples):
+        return -(-num_samples * self.up // self.down)
+
+    def _first_input(self, n):
+        return max(((n + self.delay) * self.down - len(self.h) + 1) // self.up, 0)
+
+    def _emit(self, n_end):
+        # Output n is sample (n + delay) * down of the filtered, up-sampled stream; upfirdn only
+        # lines up with that grid when the segment starts on a multiple of down.
+        n0 = self.produced
+        if n_end <= n0:
+            return np.zeros(0, dtype=self.dtype)
+        seg_start = self._first_input(n0) // self.down * self.down
+        seg_end = (n_end - 1 + self.delay) * self.down // self.up + 1
+        seg = self.buffer[seg_start - self.start:seg_end - self.start]
+        if len(seg) < seg_end - seg_start:
+            seg = np.concatenate([seg, np.zeros(seg_end - seg_start - len(seg), dtype=self.dtype)])
+        j0 = n0 + self.delay - seg_start // self.down * self.up
+        out = signal.upfirdn(self.h, seg, self.up, self.down)[j0:j0 + n_end - n0].astype(self.dtype)
+
+        self.produced = n_end
+        keep = self._first_input(n_end) // self.down * self.down
+        if keep > self.start:
+            self.buffer = self.buffer[keep - self.start:]
+            self.start = keep
+        return out
+
+    def process(self, chunk):
+        self.buffer = np.concatenate([self.buffer, np.asarray(chunk, dtype=self.dtype)])
+        self.consumed += len(chunk)
+        n_end = (self.consumed * self.up - 1) // self.down - self.delay + 1
+        return self._emit(min(n_end, self.output_length(self.consumed)))
+
+    def flush(self):
+        return self._emit(self.output_length(self.consumed))
+
+
+def peak_pyramid(audio_data, base=256, min_bins=64):
+    # Level 0 holds min/max per `base` samples; each further level halves the bin count.
+    num_bins = max(-(-len(audio_data) // base), 1)
+    padded = np.zeros(num_bins * base, dtype=np.float32)
+    padded[:len(audio_data)] = audio_data
+    if len(audio_data):
+        padded[len(audio_data):] = audio_data[-1]
+    blocks = padded.reshape(num_bins, base)
+    level = np.empty((num_bins, 2), dtype=np.int8)
+    level[:, 0] = np.clip(np.floor(blocks.min(axis=1) * 127), -127, 127)
+    level[:, 1] = np.clip(np.ceil(blocks.max(axis=1) * 127), -127, 127)
+    levels = [level]
+    while len(level) > min_bins:
+        if len(level) % 2:
+            level = np.concatenate([level, level[-1:]])
+        pairs = level.reshape(-1, 2, 2)
+        level = np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+        levels.append(level)
+    return levels
+
+
+class AudioRing:
+    # Single writer (audio thread), single reader. Writes are one slice copy (two on wrap) and
+    # never block; a reader that falls a full ring behind skips ahead instead of reading torn data.
+    def __init__(self, capacity, dtype=np.float32):
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.written = 0
+        self.active = True
+
+    def write(self, block):
+        num_samples = len(block)
+        if num_samples > self.capacity:
+            self.written += num_samples - self.capacity
+            block = block[-self.capacity:]
+            num_samples = self.capacity
+        pos = self.written % self.capacity
+        first = min(num_samples, self.capacity - pos)
+        self.buffer[pos:pos + first] = block[:first]
+        if first < num_samples:
+            self.buffer[:num_samples - first] = block[first:]
+        self.written += num_samples
+
+    def read(self, since, out=None):
+        end = self.written
+        start = max(since, end - self.capacity * 3 // 4)
+        num_samples = end - start
+        if out is None:
+            out = np.empty(num_samples, dtype=self.buffer.dtype)
+        pos = start % self.capacity
+        first = min(num_samples, self.capacity - pos)
+        out[:first] = self.buffer[pos:pos + first]
+        out[first:num_samples] = self.buffer[:num_samples - first]
+        return out[:num_samples], end, start - since
+
+
+class DriftRing(AudioRing):
+    # Bridges two streams on independent clocks. The writer only copies blocks in; the reader pulls
+    # exactly the frames it needs, resampling by a ratio within max_drift of 1 so that the smoothed
+    # fill level holds at 2.5 blocks instead of creeping into underruns or growing latency. Drift only
+    # shows up as a whole block missing when one clock overtakes the other, so the target keeps half
+    # a block spare on top of the two blocks that event can take away.
+    def __init__(self, capacity, max_drift=0.002, smoothing=0.01):
+        super().__init__(capacity)
+        self.max_drift = max_drift
+        self.smoothing = smoothing
+        self.read_pos = 0.0
+        self.block = 0
+        self.target = 0
+        self.fill = 0.0
+        self.ratio = 1.0
+        self.primed = False
+        self.underruns = 0
+        self.overruns = 0
+        self._allocate(0)
+
+    def _allocate(self, frames):
+        self.ramp = np.arange(frames, dtype=np.float64)
+        self.pos = np.zeros(frames)
+        self.idx = np.zeros(frames, dtype=np.int64)
+        self.idx1 = np.zeros(frames, dtype=np.int64)
+        self.frac = np.zeros(frames)
+        self.weight = np.zeros(frames, dtype=np.float32)
+        self.tap = np.zeros(frames, dtype=np.float32)
+
+    def prepare(self, frames):
+        # Sized ahead of the first read so the monitor callback never allocates.
+        if len(self.ramp) < frames:
+            self._allocate(frames)
+
+    def reset(self):
+        # Reader side only, while neither stream runs.
+        self.read_pos = float(self.written)
+        self.block = 0
+        self.target = 0
+        self.primed = False
+        self.ratio = 1.0
+
+    def write(self, block):
+        if len(block) > self.block:
+            self.block = len(block)
+        super().write(block)
+
+    def read(self, out) -> bool:
+        frames = len(out)
+        if len(self.ramp) < frames:
+            self._allocate(frames)
+        self.target = 5 * max(self.block, frames) // 2
+        fill = self.written - self.read_pos
+        if fill > self.capacity - self.target:
+            self.overruns += 1
+            self.read_pos = float(self.written - self.target)
+            fill = self.target
+        if not self.primed:
+            if self.block == 0 or fill < self.target:
+                out.fill(0)
+                return False
+            # Start exactly at the target rather than up to a block above it.
+            self.read_pos = float(self.written - self.target)
+            self.primed = True
+            self.fill = fill = self.target
+
+        self.fill += self.smoothing * (fill - self.fill)
+        # Full correction once the fill is a quarter off target; the smoothing keeps the loop from hunting.
+        error = min(1.0, max(-1.0, 4.0 * (self.fill - self.target) / self.target))
+        self.ratio = ratio = 1.0 + self.max_drift * error
+        if fill < ratio * frames + 2:
+            self.underruns += 1
+            self.primed = False
+            out.fill(0)
+            return False
+
+        base = int(self.read_pos)
+        pos, idx, idx1, frac, tap = self.pos[:frames], self.idx[:frames], self.idx1[:frames], self.frac[:frames], self.tap[:frames]
+        weight = self.weight[:frames]
+        np.multiply(self.ramp[:frames], ratio, out=pos)
+        pos += self.read_pos - base
+        np.copyto(idx, pos, casting='unsafe')
+        np.floor(pos, out=frac)
+        np.subtract(pos, frac, out=frac)
+        idx += base
+        np.mod(idx, self.capacity, out=idx)
+        np.add(idx, 1, out=idx1)
+        np.mod(idx1, self.capacity, out=idx1)
+        # Indices are already wrapped; mode='clip' writes straight into out instead of through a temporary.
+        np.take(self.buffer, idx, out=out, mode='clip')
+        np.take(self.buffer, idx1, out=tap, mode='clip')
+        tap -= out
+        # A float32 copy of the weights; multiplying float32 by float64 in place casts through a temporary.
+        np.copyto(weight, frac)
+        tap *= weight
+        out += tap
+        self.read_pos += ratio * frames
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "target": self.target,
+            "fill": round(self.fill, 1),
+            "drift_ppm": round((self.ratio - 1.0) * 1e6, 1),
+            "underruns": self.underruns,
+            "overruns": self.overruns
+        }
@@ -0,0 +1,393 @@
+from time import perf_counter
+
+import numpy as np
+from scipy import signal
+
+from dsp import CombReverb, DelayLine, PartitionedConvolver, partition_spectra
+from impulses import impulse_store
+from soundpad import SoundLoadError
+
+STAGE_HPF, STAGE_GATE, STAGE_EFFECT, STAGE_SOUNDPAD, STAGE_CLIP = range(5)
+
+
+class ChainError(ValueError):
+    pass
+
+
+class EffectNode:
+    stage = STAGE_EFFECT
+    string_params = ()
+
+    def __init__(self, sample_rate, dtype=np.float64):
+        self.sample_rate = sample_rate
+        self.dtype = dtype
+
+    def prepare(self, block_size):
+        pass
+
+    def process(self, buf):
+        raise NotImplementedError
+
+
+class HighPassNode(EffectNode):
+    stage = STAGE_HPF
+
+    def __init__(self, sample_rate, dtype=np.float64, cutoff=100):
+        super().__init__(sample_rate, dtype)
+        if not 10 <= cutoff < sample_rate / 2:
+            raise ChainError(f"hpf cutoff out of range: {cutoff}")
+        self.b, self.a = signal.butter(4, cutoff / (sample_rate / 2), btype='highpass')
+        self.zi = np.zeros((max(len(self.a), len(self.b)) - 1,))
+
+    def process(self, buf):
+        # lfilter has no out= parameter, so its result is the one temporary this node creates.
+        buf[:], self.zi = signal.lfilter(self.b, self.a, buf, zi=self.zi)
+
+
+class NoiseGateNode(EffectNode):
+    stage = STAGE_GATE
+
+    def __init__(self, sample_rate, dtype=np.float64, threshold=0.005):
+        super().__init__(sample_rate, dtype)
+        if threshold <= 0:
+            raise ChainError(f"gate threshold must be positive: {threshold}")
+        self.threshold = threshold
+
+    def process(self, buf):
+        rms = np.sqrt(np.dot(buf, buf) / len(buf))
+        if rms < self.threshold:
+            buf *= (rms / self.threshold) ** 2
+
+
+class EchoNode(EffectNode):
+    def __init__(self, sample_rate, dtype=np.float64, delay=0.4, feedback=0.4):
+        super().__init__(sample_rate, dtype)
+        if not 0 < delay <= 2.0:
+            raise ChainError(f"echo delay out of range: {delay}")
+        if not 0 <= feedback < 1:
+            raise ChainError(f"echo feedback out of range: {feedback}")
+        self.line = DelayLine(sample_rate * 2, int(delay * sample_rate), feedback, dtype)
+
+    def prepare(self, block_size):
+        self.line.prepare(block_size)
+
+    def process(self, buf):
+        self.line.process(buf, out=buf)
+
+
+class PitchShiftNode(EffectNode):
+    def __init__(self, sample_rate, dtype=np.float64, semitones=7):
+        super().__init__(sample_rate, dtype)
+        if not -24 <= semitones <= 24:
+            raise ChainError(f"pitch semitones out of range: {semitones}")
+        self.semitones = semitones
+        self.delay_range = int(0.06 * sample_rate)
+        self.buf_size = int(sample_rate * 0.2)
+        self.buffer = np.zeros(self.buf_size, dtype=dtype)
+        self.write_ptr = 0
+        self.phase = 0.0
+        self.block_size = 0
+
+    def _allocate(self, num_samples):
+        # The history must hold one block plus the full sweep of the taps, whatever the block size.
+        if num_samples + self.delay_range + 1 > self.buf_size:
+            self.buf_size = num_samples + self.delay_range + 1
+            self.buffer = np.zeros(self.buf_size, dtype=self.dtype)
+            self.write_ptr = 0
+        self.block_size = num_samples
+        # Tap positions and crossfade weights stay float64; the audio itself is in self.dtype.
+        self.ramp = np.arange(num_samples, dtype=np.float64)
+        self.phases = np.zeros(num_samples)
+        self.phases2 = np.zeros(num_samples)
+        # Float64 so no ufunc below mixes int and float operands, which casts through a temporary.
+        self.write_indices = np.zeros(num_samples)
+        self.pos = np.zeros(num_samples)
+        self.idx_f = np.zeros(num_samples, dtype=np.int64)
+        self.idx_c = np.zeros(num_samples, dtype=np.int64)
+        self.frac = np.zeros(num_samples)
+        self.weights = np.zeros(num_samples)
+        self.tap = np.zeros(num_samples, dtype=self.dtype)
+        self.val1 = np.zeros(num_samples, dtype=self.dtype)
+        self.val2 = np.zeros(num_samples, dtype=self.dtype)
+        # Weights are copied into this before scaling audio, so no multiply mixes float32 and float64.
+        self.gain = np.zeros(num_samples, dtype=self.dtype)
+
+    def prepare(self, block_size):
+        self._allocate(block_size)
+
+    def _interpolate(self, phases, delay_range, out):
+        pos, idx_f, idx_c, frac, tap = self.pos, self.idx_f, self.idx_c, self.frac, self.tap
+        np.multiply(phases, delay_range, out=pos)
+        np.subtract(self.write_indices, pos, out=pos)
+        np.mod(pos, self.buf_size, out=pos)
+        np.copyto(idx_f, pos, casting='unsafe')
+        np.add(idx_f, 1, out=idx_c)
+        np.mod(idx_c, self.buf_size, out=idx_c)
+        np.floor(pos, out=frac)
+        np.subtract(pos, frac, out=frac)
+        # mode='clip' writes straight into out; the default mode='raise' buffers it through a temporary.
+        np.take(self.buffer, idx_f, out=out, mode='clip')
+        np.take(self.buffer, idx_c, out=tap, mode='clip')
+        gain = self.gain
+        np.copyto(gain, frac)
+        tap *= gain
+        np.subtract(1, gain, out=gain)
+        out *= gain
+        out += tap
+
+    def process(self, buf):
+        # Dual-delay pitch shift: two read taps sweep the delay range half a period apart and are crossfaded.
+        factor = 2 ** (self.semitones / 12.0)
+        rate = 1.0 - factor
+        num_samples = len(buf)
+        if num_samples != self.block_size:
+            self._allocate(num_samples)
+        
+        delay_range = self.delay_range
+        
+        end_ptr = self.write_ptr + num_samples
+        if end_ptr <= self.buf_size:
+            self.buffer[self.write_ptr:end_ptr] = buf
+        else:
+            part1 = self.buf_size - self.write_ptr
+            self.buffer[self.write_ptr:] = buf[:part1]
+            self.buffer[:num_samples - part1] = buf[part1:]
+        self.write_ptr = (self.write_ptr + num_samples) % self.buf_size
+            
+        phase_inc = rate / delay_range
+        phases = self.phases
+        np.multiply(self.ramp, phase_inc, out=phases)
+        phases += self.phase
+        np.mod(phases, 1.0, out=phases)
+        self.phase = (phases[-1] + phase_inc) % 1.0
+        
+        phases2 = self.phases2
+        np.add(phases, 0.5, out=phases2)
+        np.mod(phases2, 1.0, out=phases2)
+        
+        np.add(self.ramp, self.write_ptr - num_samples, out=self.write_indices)
+        np.mod(self.write_indices, self.buf_size, out=self.write_indices)
+        
+        self._interpolate(phases, delay_range, self.val1)
+        self._interpolate(phases2, delay_range, self.val2)
+        
+        weights = self.weights
+        np.multiply(phases, np.pi, out=weights)
+        weights -= np.pi/2
+        np.cos(weights, out=weights)
+        np.square(weights, out=weights)
+        gain = self.gain
+        np.copyto(gain, weights)
+        self.val1 *= gain
+        np.subtract(1, gain, out=gain)
+        self.val2 *= gain
+        self.val1 += self.val2
+        
+        buf[:] = self.val1
+
+
+class RadioNode(EffectNode):
+    def __init__(self, sample_rate, dtype=np.float64):
+        super().__init__(sample_rate, dtype)
+        self.rng = np.random.default_rng()
+        self.noise = np.zeros(0, dtype=dtype)
+        self.b, self.a = signal.butter(4, [400 / (sample_rate / 2), 3000 / (sample_rate / 2)], btype='bandpass')
+        self.zi = np.zeros((max(len(self.a), len(self.b)) - 1,))
+
+    def prepare(self, block_size):
+        self.noise = np.zeros(block_size, dtype=self.dtype)
+
+    def process(self, buf):
+        processed, self.zi = signal.lfilter(self.b, self.a, buf, zi=self.zi)
+        buf[:] = processed
+        if len(self.noise) < len(buf):
+            self.noise = np.zeros(len(buf), dtype=self.dtype)
+        noise = self.noise[:len(buf)]
+        self.rng.standard_normal(dtype=self.dtype, out=noise)
+        noise *= 0.005
+        buf += noise
+        buf *= 2
+        np.clip(buf, -0.7, 0.7, out=buf)
+
+
+class ReverbNode(EffectNode):
+    def __init__(self, sample_rate, dtype=np.float64):
+        super().__init__(sample_rate, dtype)
+        delays = [int(0.0297 * sample_rate), int(0.0371 * sample_rate),
+                  int(0.0411 * sample_rate), int(0.0437 * sample_rate)]
+        self.reverb = CombReverb(delays, gain=0.7, mix=0.5, dtype=dtype)
+
+    def prepare(self, block_size):
+        self.reverb.prepare(block_size)
+
+    def process(self, buf):
+        self.reverb.process(buf, out=buf)
+
+
+class DistortionNode(EffectNode):
+    def __init__(self, sample_rate, dtype=np.float64, gain=10):
+        super().__init__(sample_rate, dtype)
+        if gain <= 0:
+            raise ChainError(f"distortion gain must be positive: {gain}")
+        self.gain = gain
+
+    def process(self, buf):
+        buf *= self.gain
+        np.arctan(buf, out=buf)
+        buf /= (np.pi / 2)
+
+
+class ConvolutionNode(EffectNode):
+    string_params = ("ir",)
+    min_partition = 256
+
+    def __init__(self, sample_rate, dtype=np.float64, ir=None, mix=0.35):
+        super().__init__(sample_rate, dtype)
+        if not 0 <= mix <= 1:
+            raise ChainError(f"convolution mix out of range: {mix}")
+        try:
+            self.response = impulse_store.get(ir) if ir is not None else None
+        except SoundLoadError as e:
+            raise ChainError(f"failed to load impulse response {ir}: {e}")
+        if self.response is None:
+            raise ChainError(f"unknown impulse response: {ir}")
+        self.ir = ir
+        self.mix = mix
+        self.convolver = None
+        self.block_size = 0
+
+    def prepare(self, block_size):
+        # Partitions match the block so each block costs one FFT pair; tiny blocks are
+        # batched through a FIFO instead, which adds one partition of wet-path latency.
+        partition = max(block_size, self.min_partition)
+        try:
+            spectra = impulse_store.get_spectra(self.ir, partition)
+        except SoundLoadError as e:
+            raise ChainError(f"failed to load impulse response {self.ir}: {e}")
+        if spectra is None:
+            # The IR file is gone; the node still holds the response it was built with.
+            spectra = partition_spectra(self.response, partition)
+        self.convolver = PartitionedConvolver(spectra, partition)
+        self.block_size = block_size
+        self.wet = np.zeros(block_size, dtype=self.dtype)
+        self.fifo_in = np.zeros(partition, dtype=self.dtype)
+        self.fifo_out = np.zeros(partition, dtype=self.dtype)
+        self.fifo_fill = 0
+
+    def process(self, buf):
+        # Buffers only change in prepare(), while the stream is stopped; a block larger than
+        # the prepared size passes through dry rather than reallocating on the audio thread.
+        num_samples = len(buf)
+        if num_samples > self.block_size:
+            return
+        convolver = self.convolver
+        wet = self.wet[:num_samples]
+        if num_samples == convolver.partition:
+            convolver.step(buf, wet)
+        else:
+            pos = 0
+            while pos < num_samples:
+                fill = self.fifo_fill
+                take = min(convolver.partition - fill, num_samples - pos)
+                self.fifo_in[fill:fill + take] = buf[pos:pos + take]
+                wet[pos:pos + take] = self.fifo_out[fill:fill + take]
+                self.fifo_fill += take
+                pos += take
+                if self.fifo_fill == convolver.partition:
+                    convolver.step(self.fifo_in, self.fifo_out)
+                    self.fifo_fill = 0
+        buf *= 1 - self.mix
+        wet *= self.mix
+        buf += wet
+
+
+NODE_TYPES = {
+    "hpf": HighPassNode,
+    "gate": NoiseGateNode,
+    "echo": EchoNode,
+    "pitch": PitchShiftNode,
+    "radio": RadioNode,
+    "reverb": ReverbNode,
+    "distortion": DistortionNode,
+    "convolution": ConvolutionNode,
+}
+
+FRONT_END = [{"type": "hpf"}, {"type": "gate"}]
+
+EFFECT_PRESETS = {
+    "none": FRONT_END,
+    "echo": FRONT_END + [{"type": "echo"}],
+    "pitch_up": FRONT_END + [{"type": "pitch", "semitones": 7}],
+    "pitch_down": FRONT_END + [{"type": "pitch", "semitones": -5}],
+    "radio": FRONT_END + [{"type": "radio"}],
+    "reverb": FRONT_END + [{"type": "reverb"}],
+    "distortion": FRONT_END + [{"type": "distortion"}],
+}
+
+MAX_CHAIN_LENGTH = 16
+
+
+class EffectChain:
+    def __init__(self, name, spec, nodes):
+        self.name = name
+        self.spec = spec
+        self.nodes = nodes
+        # Flattened once so the audio thread only walks a list of bound methods.
+        self.steps = [node.process for node in nodes]
+        self.stages = [node.stage for node in nodes]
+
+    def process(self, buf, metrics=None):
+        if metrics is None:
+            for step in self.steps:
+                step(buf)
+            return
+        for step, stage in zip(self.steps, self.stages):
+            started = perf_counter()
+            step(buf)
+            metrics.observe_stage(stage, perf_counter() - started)
+
+    def prepare(self, block_size):
+        for node in self.nodes:
+            node.prepare(block_size)
+
+    def find(self, node_type):
+        return [node for node in self.nodes if isinstance(node, node_type)]
+
+
+def chains_using(chain_specs, ir_id):
+    return [name for name, spec in chain_specs.items()
+            if any(node.get("type") == "convolution" and node.get("ir") == ir_id for node in spec)]
+
+
+def build_node(spec, sample_rate, dtype=np.float64):
+    if not isinstance(spec, dict) or "type" not in spec:
+        raise ChainError(f"node must be an object with a 'type': {spec!r}")
+    node_cls = NODE_TYPES.get(spec["type"])
+    if node_cls is None:
+        raise ChainError(f"unknown node type: {spec['type']}")
+    params = {k: v for k, v in spec.items() if k != "type"}
+    if "dtype" in params:
+        raise ChainError(f"bad parameters for {spec['type']}: dtype is not a node parameter")
+    try:
+        params = {k: (str(v) if k in node_cls.string_params else float(v)) for k, v in params.items()}
+        return node_cls(sample_rate, dtype, **params)
+    except TypeError as e:
+        raise ChainError(f"bad parameters for {spec['type']}: {e}")
+    except ValueError as e:
+        raise ChainError(str(e))
+
+
+def build_front(sample_rate, dtype=np.float64):
+    return [build_node(node_spec, sample_rate, dtype) for node_spec in FRONT_END]
+
+
+def build_chain(name, spec, sample_rate, dtype=np.float64, front=None):
+    if not isinstance(spec, list):
+        raise ChainError("chain must be a list of nodes")
+    if len(spec) > MAX_CHAIN_LENGTH:
+        raise ChainError(f"chain is longer than {MAX_CHAIN_LENGTH} nodes")
+    # Chains that start with the standard front end share its nodes, so filter and gate state
+    # carries across effect switches instead of restarting in each chain.
+    shared = front if front is not None and spec[:len(FRONT_END)] == FRONT_END else []
+    nodes = shared + [build_node(node_spec, sample_rate, dtype) for node_spec in spec[len(shared):]]
+    return EffectChain(name, spec, nodes)
@@ -0,0 +1,746 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import struct
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from audio_io import AUDIO_BACKEND, create_backend, parse_latency
+from dsp import AudioRing, DriftRing, PCMStream
+from effects import ChainError, EFFECT_PRESETS, STAGE_CLIP, build_chain
+from metrics import AudioMetrics
+from processor import AudioProcessor, SAMPLE_RATE, BLOCK_SIZE, BLOCK_SIZES, OUTPUT_LIMIT
+from tuning import BlockTuner
+
+ENGINE_MODE = os.environ.get("AUDIOCART_ENGINE", "thread")
+CONTROL_RING_BYTES = 1 << 20
+EVENT_RING_BYTES = 1 << 20
+STATE_INTERVAL = 0.05
+TUNE_INTERVAL = 0.5
+ENGINE_POLL = 0.002
+PCM_SEGMENTS_MB = int(os.environ.get("AUDIOCART_ENGINE_PCM_MB", "256"))
+SEGMENT_GRACE = 5.0
+LENGTH = struct.Struct("<I")
+
+
+class SharedAudioRing(AudioRing):
+    # AudioRing over a shared memory segment. The header holds the write counter and the
+    # listener flag, so a reader in another process sees the same positions as AudioRing.read expects.
+    def __init__(self, capacity, name=None, dtype=np.float32):
+        self.owner = name is None
+        size = 16 + capacity * np.dtype(dtype).itemsize
+        self.shm = SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.header = np.ndarray(2, dtype=np.int64, buffer=self.shm.buf)
+        self.buffer = np.ndarray(capacity, dtype=dtype, buffer=self.shm.buf, offset=16)
+        self.capacity = capacity
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self.header[0])
+
+    @written.setter
+    def written(self, value):
+        self.header[0] = value
+
+    @property
+    def active(self):
+        return bool(self.header[1])
+
+    @active.setter
+    def active(self, value):
+        self.header[1] = int(bool(value))
+
+    def close(self):
+        self.header = self.buffer = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class MessageRing:
+    # Length-prefixed pickled messages between exactly one writer and one reader process.
+    # head and tail are ever-increasing byte counters, each advanced by one side only.
+    def __init__(self, capacity=CONTROL_RING_BYTES, name=None):
+        self.owner = name is None
+        self.shm = SharedMemory(name=name, create=self.owner, size=16 + capacity if self.owner else 0)
+        self.counters = np.ndarray(2, dtype=np.int64, buffer=self.shm.buf)
+        self.capacity = len(self.shm.buf) - 16 if not self.owner else capacity
+        self.data = np.ndarray(self.capacity, dtype=np.uint8, buffer=self.shm.buf, offset=16)
+        self.dropped = 0
+        if self.owner:
+            self.counters[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, message) -> bool:
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        record = LENGTH.pack(len(payload)) + payload
+        head, tail = int(self.counters[0]), int(self.counters[1])
+        if head + len(record) - tail > self.capacity:
+            self.dropped += 1
+            return False
+        chunk = np.frombuffer(record, dtype=np.uint8)
+        pos = head % self.capacity
+        first = min(len(chunk), self.capacity - pos)
+        self.data[pos:pos + first] = chunk[:first]
+        self.data[:len(chunk) - first] = chunk[first:]
+        self.counters[0] = head + len(record)
+        return True
+
+    def _read(self, start, num_bytes):
+        pos = start % self.capacity
+        first = min(num_bytes, self.capacity - pos)
+        return self.data[pos:pos + first].tobytes() + self.data[:num_bytes - first].tobytes()
+
+    def get(self):
+        head, tail = int(self.counters[0]), int(self.counters[1])
+        if tail == head:
+            return None
+        (length,) = LENGTH.unpack(self._read(tail, LENGTH.size))
+        payload = self._read(tail + LENGTH.size, length)
+        self.counters[1] = tail + LENGTH.size + length
+        return pickle.loads(payload)
+
+    def close(self):
+        self.counters = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class AudioEngine:
+    # The audio callbacks, in whichever process owns the audio device.
+    def __init__(self, backend, processor, metrics, monitor_ring):
+        self.backend = backend
+        self.processor = processor
+        self.metrics = metrics
+        self.monitor_ring = monitor_ring
+        # Soundpad audio for the local monitor device, which runs on its own clock.
+        self.soundpad_monitor = DriftRing(SAMPLE_RATE)
+        self.monitor_block = np.zeros(backend.block_size, dtype=np.float32)
+        self.period = backend.block_size / SAMPLE_RATE
+        self.tuner = BlockTuner(processor, metrics)
+        self.lock = threading.Lock()
+        self.running = False
+
+    def audio_callback(self, indata, outdata, frames, time, status):
+        started = perf_counter()
+        metrics = self.metrics
+        metrics.observe_tick(started, self.period)
+        if status:
+            metrics.observe_status(status)
+
+        audio_input = indata[:, 0]
+        processed = self.processor.process(audio_input)
+
+        clip_started = perf_counter()
+        np.clip(processed, -OUTPUT_LIMIT, OUTPUT_LIMIT, out=processed)
+        metrics.observe_stage(STAGE_CLIP, perf_counter() - clip_started)
+
+        outdata[:, 0] = processed
+        if outdata.shape[1] > 1:
+            outdata[:, 1] = processed
+        if self.monitor_ring.active:
+            self.monitor_ring.write(processed)
+
+        self.soundpad_monitor.write(self.processor.last_soundpad_chunk)
+
+        metrics.observe_levels(audio_input, processed)
+        metrics.observe_block(perf_counter() - started, frames / SAMPLE_RATE)
+
+    def monitor_callback(self, outdata, frames, time, status):
+        if len(self.monitor_block) != frames:
+            self.monitor_block = np.zeros(frames, dtype=np.float32)
+        block = self.monitor_block
+        self.soundpad_monitor.read(block)
+        outdata[:, 0] = block
+        if outdata.shape[1] > 1:
+            outdata[:, 1] = block
+        self.metrics.observe_monitor(self.soundpad_monitor)
+
+    def start(self):
+        with self.lock:
+            if self.tuner.enabled:
+                try:
+                    self._resize_or_revert(self.tuner.tune(), self.backend.latency)
+                except Exception as e:
+                    print(f"[Engine] Auto-tuning failed, keeping {self.backend.block_size} samples: {e}")
+            self._start_stream()
+
+    def _start_stream(self):
+        try:
+            self.backend.start(self.audio_callback, self.monitor_callback)
+            self.running = True
+            if self.backend.name == "sounddevice":
+                print("✅ Аудио поток запущен успешно!")
+                print(f"📡 Говорите в микрофон - звук с эффектами будет идти в Virtual Cable")
+                print(f"🎮 В приложениях (Discord, Zoom и т.д.) выберите 'CABLE Input' как микрофон\n")
+        except Exception as e:
+            print(f"❌ Ошибка запуска аудио потока: {e}")
+
+    def _resize(self, block_size, latency):
+        # Buffers are reallocated while no callback can run, never inside the audio thread.
+        self.processor.prepare(block_size)
+        self.soundpad_monitor.prepare(block_size)
+        self.soundpad_monitor.reset()
+        self.monitor_block = np.zeros(block_size, dtype=np.float32)
+        self.backend.block_size = block_size
+        self.backend.latency = latency
+        self.period = block_size / SAMPLE_RATE
+        self.metrics.last_tick = None
+
+    def _resize_or_revert(self, block_size, latency):
+        previous = self.backend.block_size, self.backend.latency
+        try:
+            self._resize(block_size, latency)
+        except Exception:
+            self._resize(*previous)
+            raise
+
+    def _restart(self, block_size, latency):
+        # The stream comes back whatever happens; a failed resize leaves the previous size in place.
+        was_running = self.running
+        if was_running:
+            self.backend.halt()
+            self.running = False
+        try:
+            self._resize_or_revert(block_size, latency)
+        finally:
+            if was_running:
+                self._start_stream()
+        print(f"[Engine] Block size {block_size} samples ({block_size / SAMPLE_RATE * 1000:.1f}ms)")
+
+    def configure(self, block_size=None, latency=None, auto=None) -> dict:
+        if block_size is not None and block_size not in BLOCK_SIZES:
+            raise ValueError(f"block_size must be one of {', '.join(map(str, BLOCK_SIZES))}")
+        latency = parse_latency(latency) if latency is not None else self.backend.latency
+        with self.lock:
+            if auto is not None:
+                self.tuner.enabled = auto
+            elif block_size is not None:
+                self.tuner.enabled = False
+            if auto:
+                self.tuner.reset()
+                block_size = self.tuner.tune()
+            if block_size is None:
+                block_size = self.backend.block_size
+            if block_size != self.backend.block_size or latency != self.backend.latency:
+                self._restart(block_size, latency)
+        return self.config()
+
+    def tune(self):
+        # Called from a background loop, which must outlive any one failed measurement or restart.
+        try:
+            with self.lock:
+                block_size = self.tuner.check(self.backend.block_size)
+                if block_size is not None and self.running:
+                    self._restart(block_size, self.backend.latency)
+        except Exception as e:
+            print(f"[Engine] Auto-tuning failed: {e}")
+
+    def config(self) -> dict:
+        block_size = self.backend.block_size
+        budget = block_size / SAMPLE_RATE
+        return {
+            "block_size": block_size,
+            "block_sizes": list(BLOCK_SIZES),
+            "latency": self.backend.latency,
+            "budget_ms": round(budget * 1000, 3),
+            # One block buffered on each side of the callback, plus whatever the device reports.
+            "round_trip_ms": round((2 * budget + self.backend.device_latency()) * 1000, 3),
+            "auto": self.tuner.stats()
+        }
+
+    def stop(self):
+        with self.lock:
+            self.backend.stop()
+            self.running = False
+
+
+class LocalEngine:
+    # Default mode: DSP and audio callbacks share the server process.
+    name = "thread"
+
+    def __init__(self, backend_name=AUDIO_BACKEND):
+        self.processor = AudioProcessor()
+        self.metrics = AudioMetrics()
+        self.processor.metrics = self.metrics
+        self.monitor_ring = AudioRing(SAMPLE_RATE)
+        self.backend = create_backend(SAMPLE_RATE, BLOCK_SIZE, backend_name)
+        self.audio = AudioEngine(self.backend, self.processor, self.metrics, self.monitor_ring)
+        self.tuner_thread = None
+
+    @property
+    def backend_name(self):
+        return self.backend.name
+
+    def start(self):
+        self.audio.start()
+        if self.tuner_thread is None:
+            self.tuner_thread = threading.Thread(target=self._tune_loop, daemon=True, name="block-tuner")
+            self.tuner_thread.start()
+
+    def _tune_loop(self):
+        while True:
+            time.sleep(TUNE_INTERVAL)
+            self.audio.tune()
+
+    def stop(self):
+        self.audio.stop()
+
+    async def devices(self, refresh=False):
+        return self.backend.devices(refresh=refresh)
+
+    def audio_config(self) -> dict:
+        return self.audio.config()
+
+    async def configure(self, **settings) -> dict:
+        return await asyncio.to_thread(self.audio.configure, **settings)
+
+    async def prepare_sound(self, sound_id, audio):
+        # The audio thread plays cached arrays and PCM streams in place; there is nothing to copy.
+        return audio
+
+
+class EngineServer:
+    # Runs in the engine process next to the audio callback: applies control messages, maps
+    # soundpad PCM segments and publishes state snapshots. Never touches the audio callback's GIL budget
+    # for more than one message at a time.
+    def __init__(self, engine, control, events):
+        self.engine = engine
+        self.processor = engine.processor
+        self.control = control
+        self.events = events
+        self.segments = {}
+        self.closing = []
+        self.running = True
+        self.handlers = {
+            "effect": self.processor.set_effect,
+            "define_chain": self.processor.define_chain,
+            "play": self._play,
+            "stop": self.processor.stop_sound,
+            "voice_volume": self.processor.set_voice_volume,
+            "soundpad_volume": self.processor.set_soundpad_volume,
+            "echo": self.processor.set_echo,
+            "release": self._release,
+            "devices": self._devices,
+            "configure": self._configure,
+            "shutdown": self._shutdown,
+        }
+
+    def _play(self, segment, length, peak, volume, loop, sound_id, voice_id):
+        entry = self.segments.get(segment)
+        if entry is None:
+            shm = SharedMemory(name=segment)
+            entry = self.segments[segment] = (shm, np.ndarray(length, dtype=np.float32, buffer=shm.buf))
+        self.processor.play_sound(entry[1][:length], peak=peak, volume=volume, loop=loop,
+                                  sound_id=sound_id, voice_id=voice_id)
+
+    def _release(self, segment):
+        entry = self.segments.pop(segment, None)
+        if entry is not None:
+            self.closing.append(entry[0])
+
+    def _close_released(self):
+        # A voice may still hold a view of a released segment; close it once that voice is gone.
+        still_open = []
+        for shm in self.closing:
+            try:
+                shm.close()
+            except BufferError:
+                still_open.append(shm)
+        self.closing = still_open
+
+    def _devices(self, request_id, refresh):
+        self.events.put(("reply", request_id, self.engine.backend.devices(refresh=refresh)))
+
+    def _configure(self, request_id, settings):
+        try:
+            result = self.engine.configure(**settings)
+        except Exception as e:
+            result = {"error": str(e)}
+        self.events.put(("reply", request_id, result))
+
+    def _shutdown(self):
+        self.running = False
+
+    def _publish(self):
+        processor = self.processor
+        state = {
+            "effect": processor.effect,
+            "voices": processor.get_voices(),
+            "soundpad_volume": processor.soundpad_volume,
+            "echo": processor.get_echo(),
+            "backend": self.engine.backend.name,
+            "audio": self.engine.config()
+        }
+        self.events.put(("state", state, self.engine.metrics))
+
+    def run(self):
+        next_state = 0.0
+        next_tune = 0.0
+        while self.running:
+            message = self.control.get()
+            if message is not None:
+                try:
+                    self.handlers[message[0]](*message[1:])
+                except Exception as e:
+                    print(f"[Engine] Bad control message {message[0]}: {e}")
+                continue
+            now = time.monotonic()
+            if now >= next_state:
+                self._publish()
+                self._close_released()
+                next_state = now + STATE_INTERVAL
+            if now >= next_tune:
+                self.engine.tune()
+                next_tune = now + TUNE_INTERVAL
+            time.sleep(ENGINE_POLL)
+
+    def close(self):
+        for shm, _ in self.segments.values():
+            self.closing.append(shm)
+        self.segments.clear()
+        self.processor.voices.stop_all()
+        self._close_released()
+
+
+def _engine_main(control_name, events_name, monitor_name, backend_name):
+    control = MessageRing(name=control_name)
+    events = MessageRing(name=events_name)
+    monitor_ring = SharedAudioRing(SAMPLE_RATE, name=monitor_name)
+    processor = AudioProcessor()
+    metrics = AudioMetrics()
+    processor.metrics = metrics
+    engine = AudioEngine(create_backend(SAMPLE_RATE, BLOCK_SIZE, backend_name), processor, metrics, monitor_ring)
+    server = EngineServer(engine, control, events)
+    engine.start()
+    try:
+        server.run()
+    finally:
+        engine.stop()
+        server.close()
+        control.close()
+        events.close()
+        monitor_ring.close()
+
+
+class ProcessorProxy:
+    # The subset of AudioProcessor the API uses, answered from the engine's latest state snapshot.
+    def __init__(self, client):
+        self.client = client
+        self.chain_specs = dict(EFFECT_PRESETS)
+        self.voice_ids = itertools.count(1)
+
+    @property
+    def effect(self):
+        return self.client.state["effect"]
+
+    @property
+    def soundpad_volume(self):
+        return self.client.state["soundpad_volume"]
+
+    def set_effect(self, effect):
+        if effect not in self.chain_specs:
+            raise ChainError(f"Unknown effect: {effect}")
+        return self.client.send("effect", effect)
+
+    def compile_chain(self, name, spec):
+        # Validation only; the engine process builds its own copy from the spec.
+        if name in EFFECT_PRESETS:
+            raise ChainError(f"Cannot redefine built-in effect: {name}")
+        return build_chain(name, spec, SAMPLE_RATE)
+
+    def install_chain(self, chain):
+        if not self.client.send("define_chain", chain.name, chain.spec):
+            return False
+        self.chain_specs[chain.name] = chain.spec
+        return True
+
+    def define_chain(self, name, spec):
+        return self.install_chain(self.compile_chain(name, spec))
+
+    def set_soundpad_volume(self, volume):
+        return self.client.send("soundpad_volume", volume)
+
+    def play_sound(self, audio_data, peak=None, volume=1.0, loop=False, sound_id=None):
+        if len(audio_data.shape) > 1:
+            audio_data = np.mean(audio_data, axis=1)
+        if audio_data.dtype != np.float32:
+            audio_data = audio_data.astype(np.float32)
+        if peak is None:
+            peak = np.max(np.abs(audio_data)) if len(audio_data) else 0
+        voice_id = next(self.voice_ids)
+        segment = self.client.share(sound_id, audio_data)
+        if not self.client.send("play", segment, len(audio_data), float(peak), volume, loop, sound_id, voice_id):
+            return None
+        return voice_id
+
+    def stop_sound(self, voice_id=None):
+        return self.client.send("stop", voice_id)
+
+    def set_voice_volume(self, voice_id, volume):
+        return self.client.send("voice_volume", voice_id, volume)
+
+    def get_voices(self):
+        return self.client.state["voices"]
+
+    def set_echo(self, delay=None, feedback=None):
+        return self.client.send("echo", delay, feedback)
+
+    def get_echo(self):
+        return self.client.state["echo"]
+
+
+class EngineClient:
+    # AUDIOCART_ENGINE=process: the audio device, AudioProcessor and callbacks live in a spawned
+    # process with its own GIL. Control goes over one shared-memory ring, state and replies come back
+    # over another, processed audio for /ws/monitor over a SharedAudioRing, and soundpad PCM is
+    # copied once into a shared segment per sound instead of being pickled per play.
+    name = "process"
+
+    def __init__(self, backend_name=AUDIO_BACKEND, pcm_limit_mb=PCM_SEGMENTS_MB):
+        self.backend = backend_name
+        self.pcm_limit = pcm_limit_mb * 1024 * 1024
+        self.processor = ProcessorProxy(self)
+        self.metrics = AudioMetrics()
+        self.state = {
+            "effect": "none", "voices": [], "soundpad_volume": 0.7,
+            "echo": {"delay": 0.4, "feedback": 0.4}, "backend": backend_name,
+            "audio": {"block_size": BLOCK_SIZE}
+        }
+        self.control = None
+        self.events = None
+        self.monitor_ring = None
+        self.process = None
+        self.reader = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.pending = {}
+        self.segments = OrderedDict()
+        self.segment_bytes = 0
+        self.anonymous = itertools.count(1)
+
+    @property
+    def backend_name(self):
+        return self.state["backend"]
+
+    def start(self):
+        if self.process is not None:
+            return
+        # Segments are created here, not in __init__, so importing main in a spawned child allocates nothing.
+        self.control = MessageRing(CONTROL_RING_BYTES)
+        self.events = MessageRing(EVENT_RING_BYTES)
+        self.monitor_ring = SharedAudioRing(SAMPLE_RATE)
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=_engine_main, name="audiocart-engine", daemon=True,
+            args=(self.control.name, self.events.name, self.monitor_ring.name, self.backend))
+        self.process.start()
+        self.running = True
+        self.reader = threading.Thread(target=self._read_loop, daemon=True, name="engine-events")
+        self.reader.start()
+        print(f"✅ DSP engine process started (pid {self.process.pid})")
+
+    def send(self, *message) -> bool:
+        if self.control is None:
+            return False
+        with self.lock:
+            return self.control.put(message)
+
+    def request(self, op, *args) -> Future:
+        future = Future()
+        request_id = next(self.request_ids)
+        self.pending[request_id] = future
+        if not self.send(op, request_id, *args):
+            self.pending.pop(request_id, None)
+            future.set_exception(RuntimeError("engine control queue is full"))
+        return future
+
+    def _read_loop(self):
+        while self.running:
+            message = self.events.get()
+            if message is None:
+                if not self.process.is_alive():
+                    print(f"❌ DSP engine process exited (code {self.process.exitcode})")
+                    self.running = False
+                    break
+                time.sleep(STATE_INTERVAL / 5)
+                continue
+            if message[0] == "state":
+                self.state, self.metrics = message[1], message[2]
+            elif message[0] == "reply":
+                future = self.pending.pop(message[1], None)
+                if future is not None:
+                    future.set_result(message[2])
+
+    def _reuse(self, key, audio):
+        entry = self.segments.get(key)
+        if entry is None or entry[0]() is not audio:
+            return None
+        self.segments[key] = (entry[0], entry[1], time.monotonic())
+        self.segments.move_to_end(key)
+        return entry[1].name
+
+    def share(self, sound_id, audio) -> str:
+        # One segment per decoded array, reused while the cache hands out the same array.
+        # The copy runs outside the lock so control messages are never held up behind it.
+        key = sound_id if sound_id is not None else f"anonymous-{next(self.anonymous)}"
+        with self.lock:
+            name = self._reuse(key, audio)
+            if name is not None:
+                return name
+        shm = SharedMemory(create=True, size=max(1, audio.nbytes))
+        np.ndarray(len(audio), dtype=np.float32, buffer=shm.buf)[:] = audio
+        with self.lock:
+            name = self._reuse(key, audio)
+            if name is not None:
+                shm.close()
+                shm.unlink()
+                return name
+            entry = self.segments.get(key)
+            if entry is not None:
+                self.segments[f"{key}#{next(self.anonymous)}"] = self.segments.pop(key)
+            self.segments[key] = (weakref.ref(audio), shm, time.monotonic())
+            self.segment_bytes += shm.size
+            self._evict(key)
+            return shm.name
+
+    def _release(self, key):
+        _, shm, _ = self.segments.pop(key)
+        self.segment_bytes -= shm.size
+        self.control.put(("release", shm.name))
+        shm.close()
+        shm.unlink()
+
+    def _evict(self, keep):
+        # Only segments idle for a few seconds go, so a play message still in flight never loses its PCM.
+        # Segments replaced by a newer decode of the same sound go regardless of the size limit.
+        now = time.monotonic()
+        for key in list(self.segments):
+            if key == keep or now - self.segments[key][2] <= SEGMENT_GRACE:
+                continue
+            if "#" in key or self.segment_bytes > self.pcm_limit:
+                self._release(key)
+
+    async def prepare_sound(self, sound_id, audio):
+        # The engine process maps finished PCM only, so a sound still being resampled is awaited here.
+        if isinstance(audio, PCMStream):
+            await asyncio.to_thread(audio.done.wait)
+            audio = audio.data
+        # A first play copies the whole sound into shared memory, which is too slow for the event loop.
+        with self.lock:
+            if self._reuse(sound_id, audio) is not None:
+                return audio
+        await asyncio.to_thread(self.share, sound_id, audio)
+        return audio
+
+    async def devices(self, refresh=False):
+        return await asyncio.wait_for(asyncio.wrap_future(self.request("devices", refresh)), timeout=5.0)
+
+    def audio_config(self) -> dict:
+        return self.state["audio"]
+
+    async def configure(self, **settings) -> dict:
+        # Auto-tuning measures every candidate block size, so this can take a moment.
+        result = await asyncio.wait_for(asyncio.wrap_future(self.request("configure", settings)), timeout=30.0)
+        if "error" in result:
+            raise ValueError(result["error"])
+        return result
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.send("shutdown")
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.running = False
+        self.reader.join(timeout=1.0)
+        with self.lock:
+            for key in list(self.segments):
+                self._release(key)
+        self.monitor_ring.close()
+        self.control.close()
+        self.events.close()
+        self.process = None
+
+
+ENGINE_MODES = {
+    "thread": LocalEngine,
+    "process": EngineClient,
+}
+
+
+def create_engine(mode=ENGINE_MODE, backend_name=AUDIO_BACKEND):
+    engine = ENGINE_MODES.get(mode)
+    if engine is None:
+        raise ValueError(f"Unknown engine mode '{mode}'. Available: {', '.join(ENGINE_MODES)}")
+    return engine(backend_name)
+
+
+def _api_load(stop, payload):
+    # Stands in for request handlers: json.loads runs in C and holds the GIL for the whole call.
+    while not stop.is_set():
+        json.loads(payload)
+
+
+def bench_mode(mode, seconds=5.0, load_threads=2):
+    engine = create_engine(mode, "null")
+    engine.start()
+    time.sleep(1.0)
+    payload = json.dumps({"sounds": [{"id": f"{i:08x}", "name": f"sound {i}", "peak": 0.5, "tags": ["a", "b"]}
+                                     for i in range(5000)]})
+    stop = threading.Event()
+    threads = [threading.Thread(target=_api_load, args=(stop, payload), daemon=True) for _ in range(load_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    time.sleep(STATE_INTERVAL * 4)
+    snapshot = engine.metrics.snapshot()
+    engine.stop()
+    return {
+        "mode": mode,
+        "blocks": snapshot["blocks"],
+        "jitter_mean_ms": snapshot["jitter"]["mean_ms"],
+        "jitter_max_ms": snapshot["jitter"]["max_ms"],
+        "late_blocks": snapshot["xruns"]["output_underflow"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare audio callback jitter with the DSP engine in-process vs in its own process")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--load-threads", type=int, default=2, help="threads parsing JSON in the server process")
+    args = parser.parse_args(argv)
+    for mode in ENGINE_MODES:
+        r = bench_mode(mode, args.seconds, args.load_threads)
+        print(f"[Engine] {r['mode']:<8} {r['blocks']} blocks, jitter mean {r['jitter_mean_ms']:.3f}ms "
+              f"max {r['jitter_max_ms']:.3f}ms, late blocks {r['late_blocks']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import Optional
+import threading
+
+import numpy as np
+
+from dsp import partition_spectra
+from soundpad import AUDIO_EXTENSIONS, SAMPLE_RATE, SOUNDS_DIR, decode_sound
+
+IR_DIR = SOUNDS_DIR / "ir"
+MAX_IR_SECONDS = 10
+
+
+class ImpulseStore:
+    def __init__(self):
+        self.responses = {}
+        self.spectra = {}
+        self.lock = threading.Lock()
+        self.users = lambda ir_id: []
+
+    def find_file(self, ir_id: str) -> Optional[Path]:
+        # Exact stem match rather than a glob, so an id like "*" matches nothing.
+        if not IR_DIR.exists():
+            return None
+        for file_path in IR_DIR.iterdir():
+            if file_path.stem == ir_id and file_path.suffix.lower() in AUDIO_EXTENSIONS:
+                return file_path
+        return None
+
+    def register(self, ir_id: str, ir: np.ndarray):
+        ir = np.asarray(ir, dtype=np.float64)[:MAX_IR_SECONDS * SAMPLE_RATE]
+        energy = np.sqrt(np.dot(ir, ir))
+        if energy > 0:
+            ir = ir / energy
+        with self.lock:
+            self.responses[ir_id] = ir
+            self.spectra = {k: v for k, v in self.spectra.items() if k[0] != ir_id}
+
+    def get(self, ir_id: str) -> Optional[np.ndarray]:
+        with self.lock:
+            ir = self.responses.get(ir_id)
+        if ir is not None:
+            return ir
+        file_path = self.find_file(ir_id)
+        if file_path is None:
+            return None
+        self.register(ir_id, decode_sound(file_path))
+        with self.lock:
+            return self.responses.get(ir_id)
+
+    def get_spectra(self, ir_id: str, partition: int) -> Optional[np.ndarray]:
+        with self.lock:
+            spectra = self.spectra.get((ir_id, partition))
+        if spectra is not None:
+            return spectra
+        ir = self.get(ir_id)
+        if ir is None:
+            return None
+        spectra = partition_spectra(ir, partition)
+        with self.lock:
+            self.spectra[(ir_id, partition)] = spectra
+        return spectra
+
+    def invalidate(self, ir_id: str):
+        with self.lock:
+            self.responses.pop(ir_id, None)
+            self.spectra = {k: v for k, v in self.spectra.items() if k[0] != ir_id}
+
+    def list(self) -> list:
+        IR_DIR.mkdir(parents=True, exist_ok=True)
+        result = []
+        for file_path in IR_DIR.glob("*"):
+            if file_path.suffix.lower() in AUDIO_EXTENSIONS:
+                result.append({"id": file_path.stem, "filename": file_path.name})
+        return result
+
+
+impulse_store = ImpulseStore()
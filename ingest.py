@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing
+import os
+import threading
+
+from library import library
+from soundpad import SoundLoadError, ingest_sound, remove_sidecar, sidecar_is_fresh, sound_cache
+
+INGEST_WORKERS = int(os.environ.get("AUDIOCART_INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+INGEST_QUEUE_SIZE = 1024
+ANALYSIS_FIELDS = ("duration_seconds", "peak", "rms", "gain")
+
+
+class IngestQueue:
+    def __init__(self, workers=INGEST_WORKERS, max_pending=INGEST_QUEUE_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pool = None
+        self.jobs = {}
+        self.done = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        # spawn, not fork: the server process already runs audio and decode threads.
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def submit(self, sound_id: str, file_path: Path) -> bool:
+        with self.lock:
+            job = self.jobs.get(sound_id)
+            if job is not None and job["status"] == "queued":
+                return True
+            pending = sum(1 for j in self.jobs.values() if j["status"] == "queued")
+            if pending >= self.max_pending:
+                print(f"[Ingest] Queue full, {sound_id} will be decoded on first play")
+                return False
+            self.jobs[sound_id] = {"id": sound_id, "status": "queued"}
+            future = self._executor().submit(ingest_sound, file_path)
+        future.add_done_callback(lambda f: self._finish(sound_id, f))
+        return True
+
+    def submit_library(self) -> int:
+        count = 0
+        for sound_id, meta, file_path in library.entries():
+            if all(field in meta for field in ANALYSIS_FIELDS) and sidecar_is_fresh(file_path):
+                continue
+            if self.submit(sound_id, file_path):
+                count += 1
+        return count
+
+    def _finish(self, sound_id, future):
+        try:
+            stats = future.result()
+        except SoundLoadError as e:
+            self._record(sound_id, "failed", str(e))
+            print(f"[Ingest] Failed to ingest {sound_id}: {e}")
+            return
+        except Exception as e:
+            self._record(sound_id, "failed", str(e) or type(e).__name__)
+            print(f"[Ingest] Worker error for {sound_id}: {e!r}")
+            return
+        if not library.update(sound_id, stats):
+            remove_sidecar(sound_id)
+        sound_cache.invalidate(sound_id)
+        self._record(sound_id, "done")
+
+    def _record(self, sound_id, status, error=None):
+        with self.lock:
+            job = self.jobs.get(sound_id)
+            if job is None:
+                return
+            if status == "done":
+                self.done += 1
+                del self.jobs[sound_id]
+            else:
+                self.failed += 1
+                job["status"] = status
+                job["error"] = error
+
+    def forget(self, sound_id: str):
+        with self.lock:
+            self.jobs.pop(sound_id, None)
+
+    def progress(self) -> dict:
+        with self.lock:
+            queued = [j["id"] for j in self.jobs.values() if j["status"] == "queued"]
+            failed = [dict(j) for j in self.jobs.values() if j["status"] == "failed"]
+            return {
+                "workers": self.workers,
+                "queued": len(queued),
+                "done": self.done,
+                "failed": self.failed,
+                "pending_ids": queued,
+                "errors": failed
+            }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+ingest_queue = IngestQueue()
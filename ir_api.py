@@ -0,0 +1,53 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import shutil
+import uuid
+from pathlib import Path
+
+from impulses import IR_DIR, impulse_store
+from soundpad import AUDIO_EXTENSIONS, SAMPLE_RATE, SoundLoadError
+
+router = APIRouter(prefix="/api/irs", tags=["impulse responses"])
+
+IR_DIR.mkdir(parents=True, exist_ok=True)
+
+@router.get("")
+async def list_impulse_responses():
+    return {"irs": impulse_store.list()}
+
+@router.post("")
+async def add_impulse_response(file: UploadFile = File(...)):
+    file_ext = Path(file.filename).suffix.lower()
+    
+    if file_ext not in AUDIO_EXTENSIONS:
+        raise HTTPException(400, f"Invalid file type. Allowed: {', '.join(AUDIO_EXTENSIONS)}")
+    
+    ir_id = str(uuid.uuid4())[:8]
+    file_path = IR_DIR / f"{ir_id}{file_ext}"
+    
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+    
+    try:
+        ir = await run_in_threadpool(impulse_store.get, ir_id)
+    except SoundLoadError as e:
+        file_path.unlink()
+        raise HTTPException(400, str(e))
+    
+    return {"status": "ok", "ir": {"id": ir_id, "filename": file_path.name, "seconds": len(ir) / SAMPLE_RATE}}
+
+@router.delete("/{ir_id}")
+async def delete_impulse_response(ir_id: str):
+    file_path = impulse_store.find_file(ir_id)
+    
+    if file_path is None:
+        raise HTTPException(404, "Impulse response not found")
+    
+    users = impulse_store.users(ir_id)
+    if users:
+        raise HTTPException(409, f"Impulse response is used by chains: {', '.join(users)}")
+    
+    file_path.unlink()
+    impulse_store.invalidate(ir_id)
+    
+    return {"status": "ok", "deleted": ir_id}
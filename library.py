@@ -0,0 +1,159 @@
+from bisect import bisect_right, insort
+from pathlib import Path
+from typing import Optional
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+
+from soundpad import AUDIO_EXTENSIONS, SOUNDS_DIR
+
+METADATA_FILE = SOUNDS_DIR / "metadata.json"
+SAVE_DELAY = 0.5
+
+
+class SoundLibrary:
+    # Loaded once; the in-memory index is the source of truth and metadata.json is a snapshot of it.
+    def __init__(self, sounds_dir: Path = SOUNDS_DIR, metadata_file: Path = METADATA_FILE):
+        self.sounds_dir = sounds_dir
+        self.metadata_file = metadata_file
+        self.paths = {}
+        self.metadata = {}
+        self.ids = []
+        self.generation = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.saver = None
+
+    def load(self):
+        # Pending edits go to disk first, so re-reading the file never drops them.
+        self.flush()
+        self.sounds_dir.mkdir(exist_ok=True)
+        metadata = {}
+        if self.metadata_file.exists():
+            with open(self.metadata_file, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        paths = {}
+        with os.scandir(self.sounds_dir) as it:
+            for entry in it:
+                path = Path(entry.path)
+                if entry.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS:
+                    paths.setdefault(path.stem, path)
+        with self.lock:
+            if self.dirty.is_set():
+                # Edited while the file was being read; those entries are newer than the file.
+                metadata.update(self.metadata)
+            self.metadata = metadata
+            self.paths = paths
+            self.ids = sorted(paths)
+            self.version += 1
+        print(f"[Library] Indexed {len(paths)} sounds")
+
+    def etag(self, cursor: Optional[str] = None, limit: Optional[int] = None, query: Optional[str] = None) -> str:
+        # Each page and search is its own representation, so the query is part of the tag.
+        key = zlib.crc32(repr((cursor, limit, query)).encode())
+        return f'"{self.generation}-{self.version}-{key:08x}"'
+
+    def _item(self, sound_id):
+        meta = self.metadata.get(sound_id, {})
+        return {
+            "id": sound_id,
+            "filename": self.paths[sound_id].name,
+            "name": meta.get("name", sound_id),
+            "emoji": meta.get("emoji", "🎵"),
+            "duration": meta.get("duration", "0.0s")
+        }
+
+    def find(self, sound_id: str) -> Optional[Path]:
+        return self.paths.get(sound_id)
+
+    def get(self, sound_id: str) -> Optional[dict]:
+        with self.lock:
+            if sound_id not in self.paths:
+                return None
+            return self._item(sound_id)
+
+    def entries(self) -> list:
+        with self.lock:
+            return [(sound_id, dict(self.metadata.get(sound_id, {})), self.paths[sound_id]) for sound_id in self.ids]
+
+    def page(self, cursor: Optional[str] = None, limit: Optional[int] = None, query: Optional[str] = None):
+        with self.lock:
+            etag = self.etag(cursor, limit, query)
+            query = query.casefold() if query else None
+            start = bisect_right(self.ids, cursor) if cursor else 0
+            items = []
+            for sound_id in self.ids[start:]:
+                if limit is not None and len(items) == limit:
+                    return items, items[-1]["id"], etag
+                if query and query not in self.metadata.get(sound_id, {}).get("name", sound_id).casefold():
+                    continue
+                items.append(self._item(sound_id))
+            return items, None, etag
+
+    def add(self, sound_id: str, path: Path, meta: dict):
+        with self.lock:
+            if sound_id not in self.paths:
+                insort(self.ids, sound_id)
+            self.paths[sound_id] = path
+            self.metadata[sound_id] = dict(meta)
+            self.version += 1
+        self.schedule_save()
+
+    def update(self, sound_id: str, fields: dict) -> bool:
+        with self.lock:
+            if sound_id not in self.metadata and sound_id not in self.paths:
+                return False
+            self.metadata.setdefault(sound_id, {}).update(fields)
+            self.version += 1
+        self.schedule_save()
+        return True
+
+    def remove(self, sound_id: str) -> Optional[Path]:
+        with self.lock:
+            path = self.paths.pop(sound_id, None)
+            if path is None:
+                return None
+            self.ids.pop(bisect_right(self.ids, sound_id) - 1)
+            self.metadata.pop(sound_id, None)
+            self.version += 1
+        self.schedule_save()
+        return path
+
+    def schedule_save(self):
+        # Bursts of edits collapse into one rewrite; the writer thread starts on first use.
+        self.dirty.set()
+        if self.saver is None:
+            self.saver = threading.Thread(target=self._save_loop, daemon=True)
+            self.saver.start()
+
+    def _save_loop(self):
+        while True:
+            self.dirty.wait()
+            time.sleep(SAVE_DELAY)
+            self.flush()
+
+    def flush(self):
+        with self.save_lock:
+            if not self.dirty.is_set():
+                return
+            self.dirty.clear()
+            with self.lock:
+                snapshot = {sound_id: dict(meta) for sound_id, meta in self.metadata.items()}
+            tmp_path = self.metadata_file.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.metadata_file)
+            except OSError as e:
+                self.dirty.set()
+                print(f"[Library] Failed to save metadata: {e}")
+
+
+library = SoundLibrary()
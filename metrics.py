@@ -0,0 +1,168 @@
+from bisect import bisect_left
+import math
+
+import numpy as np
+
+STAGES = ("hpf", "gate", "effect", "soundpad", "clip")
+XRUN_TYPES = ("input_underflow", "input_overflow", "output_underflow", "output_overflow", "priming_output")
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class Histogram:
+    # Written only by the audio thread; readers may see a block-old snapshot, which is fine for metrics.
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {
+            "buckets": [{"le": le, "count": c} for le, c in zip(list(self.bounds) + ["+Inf"], self.counts)],
+            "count": self.count,
+            "mean_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+    def prometheus(self, name, labels=""):
+        lines = []
+        cumulative = 0
+        for le, c in zip(list(self.bounds) + ["+Inf"], self.counts):
+            cumulative += c
+            sep = "," if labels else ""
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class AudioMetrics:
+    def __init__(self):
+        self.callback = Histogram()
+        self.jitter = Histogram()
+        self.last_tick = None
+        self.stages = [Histogram() for _ in STAGES]
+        self.xruns = [0] * len(XRUN_TYPES)
+        self.blocks = 0
+        self.deadline_misses = 0
+        self.monitor_drops = 0
+        self.monitor_underruns = 0
+        self.monitor_fill = 0.0
+        self.monitor_target = 0
+        self.monitor_drift_ppm = 0.0
+        self.input_peak = 0.0
+        self.input_rms = 0.0
+        self.output_peak = 0.0
+        self.output_rms = 0.0
+
+    def observe_stage(self, index, seconds):
+        self.stages[index].observe(seconds)
+
+    def observe_tick(self, now, period):
+        # How far each callback start strays from one block period after the previous one.
+        if self.last_tick is not None:
+            self.jitter.observe(abs(now - self.last_tick - period))
+        self.last_tick = now
+
+    def observe_block(self, seconds, budget):
+        self.callback.observe(seconds)
+        self.blocks += 1
+        if seconds > budget:
+            self.deadline_misses += 1
+
+    def observe_status(self, status):
+        for i, name in enumerate(XRUN_TYPES):
+            if getattr(status, name, False):
+                self.xruns[i] += 1
+
+    def observe_monitor(self, ring):
+        self.monitor_drops = ring.overruns
+        self.monitor_underruns = ring.underruns
+        self.monitor_fill = ring.fill
+        self.monitor_target = ring.target
+        self.monitor_drift_ppm = (ring.ratio - 1.0) * 1e6
+
+    def observe_levels(self, input_block, output_block):
+        self.input_peak, self.input_rms = _levels(input_block)
+        self.output_peak, self.output_rms = _levels(output_block)
+
+    def snapshot(self):
+        return {
+            "blocks": self.blocks,
+            "deadline_misses": self.deadline_misses,
+            "callback": self.callback.snapshot(),
+            "jitter": self.jitter.snapshot(),
+            "stages": {name: h.snapshot() for name, h in zip(STAGES, self.stages)},
+            "xruns": dict(zip(XRUN_TYPES, self.xruns)),
+            "monitor": {
+                "drops": self.monitor_drops,
+                "underruns": self.monitor_underruns,
+                "fill_samples": round(self.monitor_fill, 1),
+                "target_samples": self.monitor_target,
+                "drift_ppm": round(self.monitor_drift_ppm, 1)
+            },
+            "levels": {
+                "input": {"peak": self.input_peak, "rms": self.input_rms},
+                "output": {"peak": self.output_peak, "rms": self.output_rms}
+            }
+        }
+
+    def prometheus(self):
+        lines = [
+            "# HELP audiocart_callback_seconds Audio callback processing time",
+            "# TYPE audiocart_callback_seconds histogram",
+        ]
+        lines += self.callback.prometheus("audiocart_callback_seconds")
+        lines += [
+            "# HELP audiocart_callback_jitter_seconds Deviation of callback start from the block period",
+            "# TYPE audiocart_callback_jitter_seconds histogram",
+        ]
+        lines += self.jitter.prometheus("audiocart_callback_jitter_seconds")
+        lines += [
+            "# HELP audiocart_stage_seconds DSP stage processing time",
+            "# TYPE audiocart_stage_seconds histogram",
+        ]
+        for name, h in zip(STAGES, self.stages):
+            lines += h.prometheus("audiocart_stage_seconds", f'stage="{name}"')
+        lines += [
+            "# TYPE audiocart_blocks_total counter",
+            f"audiocart_blocks_total {self.blocks}",
+            "# TYPE audiocart_deadline_misses_total counter",
+            f"audiocart_deadline_misses_total {self.deadline_misses}",
+            "# TYPE audiocart_xruns_total counter",
+        ]
+        lines += [f'audiocart_xruns_total{{type="{name}"}} {n}' for name, n in zip(XRUN_TYPES, self.xruns)]
+        lines += [
+            "# TYPE audiocart_monitor_drops_total counter",
+            f"audiocart_monitor_drops_total {self.monitor_drops}",
+            "# TYPE audiocart_monitor_underruns_total counter",
+            f"audiocart_monitor_underruns_total {self.monitor_underruns}",
+            "# TYPE audiocart_monitor_fill_samples gauge",
+            f"audiocart_monitor_fill_samples {self.monitor_fill}",
+            "# TYPE audiocart_monitor_drift_ppm gauge",
+            f"audiocart_monitor_drift_ppm {self.monitor_drift_ppm}",
+            "# TYPE audiocart_level_peak gauge",
+            f'audiocart_level_peak{{signal="input"}} {self.input_peak}',
+            f'audiocart_level_peak{{signal="output"}} {self.output_peak}',
+            "# TYPE audiocart_level_rms gauge",
+            f'audiocart_level_rms{{signal="input"}} {self.input_rms}',
+            f'audiocart_level_rms{{signal="output"}} {self.output_rms}',
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _levels(block):
+    if len(block) == 0:
+        return 0.0, 0.0
+    peak = max(float(block.max()), -float(block.min()))
+    rms = math.sqrt(float(np.dot(block, block)) / len(block))
+    return peak, rms
@@ -0,0 +1,314 @@
+from concurrent.futures import Future
+import argparse
+import os
+import threading
+import time
+
+try:
+    from pycaw.pycaw import AudioUtilities, ISimpleAudioVolume
+    import comtypes
+    PYCAW_AVAILABLE = True
+except ImportError:
+    PYCAW_AVAILABLE = False
+
+MIXER_BACKEND = os.environ.get("AUDIOCART_MIXER_BACKEND", "pycaw")
+SESSION_TTL = 2.0
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+class PycawBackend:
+    def init_thread(self):
+        comtypes.CoInitialize()
+
+    def list_sessions(self):
+        result = []
+        for session in AudioUtilities.GetAllSessions():
+            if session.Process:
+                try:
+                    result.append((session.Process.pid, session.Process.name(), session._ctl.QueryInterface(ISimpleAudioVolume)))
+                except Exception as e:
+                    print(f"Error getting session info: {e}")
+        return result
+
+    def get_volume(self, handle):
+        return handle.GetMasterVolume()
+
+    def set_volume(self, handle, volume):
+        handle.SetMasterVolume(volume, None)
+
+    def get_mute(self, handle):
+        return bool(handle.GetMute())
+
+    def set_mute(self, handle, mute):
+        handle.SetMute(mute, None)
+
+
+class FakeSession:
+    def __init__(self, pid, name, volume=1.0, muted=False):
+        self.pid = pid
+        self.name = name
+        self.volume = volume
+        self.muted = muted
+        self.alive = True
+
+
+class FakeBackend:
+    # In-process stand-in with pycaw-like costs, so the registry can be exercised without Windows.
+    def __init__(self, sessions=None, enumerate_cost=0.005, query_cost=0.0002, call_cost=0.00005):
+        if sessions is None:
+            sessions = [FakeSession(1000 + i, name) for i, name in enumerate(("chrome.exe", "discord.exe", "spotify.exe"))]
+        self.sessions = {s.pid: s for s in sessions}
+        self.enumerate_cost = enumerate_cost
+        self.query_cost = query_cost
+        self.call_cost = call_cost
+        self.enumerations = 0
+        self.calls = 0
+
+    def init_thread(self):
+        pass
+
+    def _call(self, handle):
+        time.sleep(self.call_cost)
+        self.calls += 1
+        if not handle.alive:
+            raise OSError("session expired")
+
+    def list_sessions(self):
+        time.sleep(self.enumerate_cost + self.query_cost * len(self.sessions))
+        self.enumerations += 1
+        return [(s.pid, s.name, s) for s in self.sessions.values() if s.alive]
+
+    def get_volume(self, handle):
+        self._call(handle)
+        return handle.volume
+
+    def set_volume(self, handle, volume):
+        self._call(handle)
+        handle.volume = volume
+
+    def get_mute(self, handle):
+        self._call(handle)
+        return handle.muted
+
+    def set_mute(self, handle, mute):
+        self._call(handle)
+        handle.muted = mute
+
+
+class SessionRegistry:
+    # All backend calls run on one worker thread (COM handles are apartment-bound), in submission
+    # order. Volume updates for a PID that is still waiting are superseded by the newest one, which
+    # keeps its own place in the queue, and all of them share one completion.
+    def __init__(self, backend, ttl=SESSION_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.sessions = {}
+        self.refreshed_at = 0.0
+        self.pending_volumes = {}
+        self.tasks = []
+        self.cond = threading.Condition()
+        self.worker = None
+        self.requested = 0
+        self.applied = 0
+        self.refreshes = 0
+
+    def _start(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, daemon=True, name="mixer")
+            self.worker.start()
+
+    def _run(self):
+        self.backend.init_thread()
+        while True:
+            with self.cond:
+                while not self.tasks:
+                    self.cond.wait()
+                tasks, self.tasks = self.tasks, []
+                volumes, self.pending_volumes = self.pending_volumes, {}
+            for task in tasks:
+                fn, args, future = task
+                if fn == self._set_volume and volumes[args[0]] is not task:
+                    continue
+                self._resolve(future, fn, *args)
+
+    def _resolve(self, future, fn, *args):
+        try:
+            future.set_result(fn(*args))
+        except SessionNotFound:
+            future.set_result({"error": "Session not found"})
+        except Exception as e:
+            future.set_result({"error": str(e)})
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        with self.cond:
+            self.tasks.append((fn, args, future))
+            self.cond.notify()
+        self._start()
+        return future
+
+    def _refresh(self):
+        self.sessions = {pid: (name, handle) for pid, name, handle in self.backend.list_sessions()}
+        self.refreshed_at = time.monotonic()
+        self.refreshes += 1
+
+    def _with_handle(self, pid, fn):
+        # Cached handles are used until they fail or the PID is unknown; then one re-enumeration and retry.
+        entry = self.sessions.get(pid)
+        if entry is not None:
+            try:
+                return fn(entry[1])
+            except Exception:
+                pass
+        self._refresh()
+        entry = self.sessions.get(pid)
+        if entry is None:
+            raise SessionNotFound(pid)
+        return fn(entry[1])
+
+    def _list(self):
+        if time.monotonic() - self.refreshed_at > self.ttl:
+            self._refresh()
+        result = []
+        for pid, (name, handle) in list(self.sessions.items()):
+            try:
+                result.append({
+                    "pid": pid,
+                    "name": name,
+                    "volume": round(self.backend.get_volume(handle) * 100),
+                    "muted": self.backend.get_mute(handle)
+                })
+            except Exception as e:
+                print(f"Error getting session info: {e}")
+                self.refreshed_at = 0.0
+        return {"sessions": result}
+
+    def _set_volume(self, pid, volume):
+        self._with_handle(pid, lambda handle: self.backend.set_volume(handle, volume))
+        self.applied += 1
+        return {"status": "ok", "pid": pid, "volume": round(volume * 100)}
+
+    def _set_mute(self, pid, mute):
+        def apply(handle):
+            value = (not self.backend.get_mute(handle)) if mute is None else bool(mute)
+            self.backend.set_mute(handle, value)
+            return value
+        return {"status": "ok", "pid": pid, "muted": self._with_handle(pid, apply)}
+
+    def _apply_batch(self, updates):
+        results = []
+        for update in updates:
+            try:
+                pid = int(update["pid"])
+                if "volume" not in update and "mute" not in update:
+                    raise ValueError("nothing to update")
+                result = {"pid": pid, "status": "ok"}
+                if "volume" in update:
+                    volume = max(0, min(100, int(update["volume"]))) / 100.0
+                    self._with_handle(pid, lambda handle: self.backend.set_volume(handle, volume))
+                    self.applied += 1
+                    result["volume"] = round(volume * 100)
+                if "mute" in update:
+                    result["muted"] = self._set_mute(pid, update["mute"])["muted"]
+            except SessionNotFound:
+                result = {"pid": update.get("pid"), "error": "Session not found"}
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                result = {"pid": update.get("pid") if isinstance(update, dict) else None, "error": f"Bad update: {e}"}
+            results.append(result)
+        return {"status": "ok", "results": results}
+
+    def list(self) -> Future:
+        return self.submit(self._list)
+
+    def set_volume(self, pid, volume) -> Future:
+        with self.cond:
+            self.requested += 1
+            pending = self.pending_volumes.get(pid)
+            future = pending[2] if pending is not None else Future()
+            task = (self._set_volume, (pid, volume), future)
+            self.pending_volumes[pid] = task
+            self.tasks.append(task)
+            self.cond.notify()
+        self._start()
+        return future
+
+    def set_mute(self, pid, mute=None) -> Future:
+        return self.submit(self._set_mute, pid, mute)
+
+    def set_many(self, updates) -> Future:
+        return self.submit(self._apply_batch, updates)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "refreshes": self.refreshes,
+            "volume_requests": self.requested,
+            "volume_applied": self.applied,
+            "ttl": self.ttl
+        }
+
+
+def create_registry():
+    if MIXER_BACKEND == "fake":
+        print("[Mixer] Using in-process fake backend")
+        return SessionRegistry(FakeBackend())
+    if not PYCAW_AVAILABLE:
+        print("⚠️ pycaw not installed. Mixer will not work. Install with: pip install pycaw comtypes")
+        return None
+    return SessionRegistry(PycawBackend())
+
+
+def _bench_uncached(backend, pids, updates):
+    # The old per-request path: enumerate every session, scan for the PID, set.
+    for i in range(updates):
+        pid = pids[i % len(pids)]
+        for session_pid, _, handle in backend.list_sessions():
+            if session_pid == pid:
+                backend.set_volume(handle, (i % 100) / 100)
+                break
+
+
+def _bench_registry(backend, pids, updates, interval):
+    registry = SessionRegistry(backend)
+    futures = []
+    for i in range(updates):
+        futures.append(registry.set_volume(pids[i % len(pids)], (i % 100) / 100))
+        if interval:
+            time.sleep(interval)
+    for future in futures:
+        future.result()
+    return registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark mixer volume updates against the fake session backend")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=0.001, help="seconds between updates (slider drag rate)")
+    args = parser.parse_args(argv)
+
+    pids = list(range(1000, 1000 + args.sessions))
+    make = lambda: FakeBackend([FakeSession(pid, f"app{pid}.exe") for pid in pids])
+
+    backend = make()
+    started = time.perf_counter()
+    _bench_uncached(backend, pids[:2], args.updates)
+    uncached = time.perf_counter() - started
+    print(f"[Mixer] uncached: {args.updates} updates in {uncached * 1000:.1f}ms, "
+          f"{backend.enumerations} enumerations, {backend.calls} backend calls")
+
+    backend = make()
+    started = time.perf_counter()
+    registry = _bench_registry(backend, pids[:2], args.updates, args.interval)
+    cached = time.perf_counter() - started
+    stats = registry.stats()
+    print(f"[Mixer] registry: {args.updates} updates in {cached * 1000:.1f}ms, "
+          f"{backend.enumerations} enumerations, {stats['volume_applied']} applied, {backend.calls} backend calls")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
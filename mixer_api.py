@@ -1,47 +1,32 @@
 from fastapi import APIRouter
-import json
+import asyncio
+
+from mixer import create_registry
 
 router = APIRouter(prefix="/api/mixer", tags=["mixer"])
 
-try:
-    from pycaw.pycaw import AudioUtilities, ISimpleAudioVolume
-    from comtypes import CLSCTX_ALL
-    PYCAW_AVAILABLE = True
-except ImportError:
-    PYCAW_AVAILABLE = False
-    print("⚠️ pycaw not installed. Mixer will not work. Install with: pip install pycaw comtypes")
+registry = create_registry()
+
+def _session_pid(pid):
+    # Session PIDs are integers; anything else can't name a session.
+    try:
+        return int(pid)
+    except (TypeError, ValueError):
+        return None
 
 @router.get("")
 async def get_audio_sessions():
-    if not PYCAW_AVAILABLE:
+    if registry is None:
         return {"error": "pycaw not installed", "sessions": []}
     
-    try:
-        sessions = AudioUtilities.GetAllSessions()
-        result = []
-        
-        for session in sessions:
-            if session.Process:
-                try:
-                    volume = session._ctl.QueryInterface(ISimpleAudioVolume)
-                    result.append({
-                        "pid": session.Process.pid,
-                        "name": session.Process.name(),
-                        "volume": round(volume.GetMasterVolume() * 100),
-                        "muted": volume.GetMute()
-                    })
-                except Exception as e:
-                    print(f"Error getting session info: {e}")
-                    continue
-        
-        return {"sessions": result}
-    
-    except Exception as e:
-        return {"error": str(e), "sessions": []}
+    result = await asyncio.wrap_future(registry.list())
+    if "error" in result:
+        return {"error": result["error"], "sessions": []}
+    return result
 
 @router.post("/volume")
 async def set_app_volume(data: dict):
-    if not PYCAW_AVAILABLE:
+    if registry is None:
         return {"error": "pycaw not installed"}
     
     pid = data.get("pid")
@@ -50,25 +35,16 @@ async def set_app_volume(data: dict):
     if pid is None:
         return {"error": "PID is required"}
     
-    volume = max(0, min(100, int(volume))) / 100.0
-    
-    try:
-        sessions = AudioUtilities.GetAllSessions()
-        
-        for session in sessions:
-            if session.Process and session.Process.pid == pid:
-                vol_control = session._ctl.QueryInterface(ISimpleAudioVolume)
-                vol_control.SetMasterVolume(volume, None)
-                return {"status": "ok", "pid": pid, "volume": round(volume * 100)}
-        
+    pid = _session_pid(pid)
+    if pid is None:
         return {"error": "Session not found"}
     
-    except Exception as e:
-        return {"error": str(e)}
+    volume = max(0, min(100, int(volume))) / 100.0
+    return await asyncio.wrap_future(registry.set_volume(pid, volume))
 
 @router.post("/mute")
 async def toggle_mute(data: dict):
-    if not PYCAW_AVAILABLE:
+    if registry is None:
         return {"error": "pycaw not installed"}
     
     pid = data.get("pid")
@@ -77,22 +53,25 @@ async def toggle_mute(data: dict):
     if pid is None:
         return {"error": "PID is required"}
     
-    try:
-        sessions = AudioUtilities.GetAllSessions()
-        
-        for session in sessions:
-            if session.Process and session.Process.pid == pid:
-                vol_control = session._ctl.QueryInterface(ISimpleAudioVolume)
-                
-                if mute is None:
-                    current_mute = vol_control.GetMute()
-                    vol_control.SetMute(not current_mute, None)
-                    return {"status": "ok", "pid": pid, "muted": not current_mute}
-                else:
-                    vol_control.SetMute(bool(mute), None)
-                    return {"status": "ok", "pid": pid, "muted": bool(mute)}
-        
+    pid = _session_pid(pid)
+    if pid is None:
         return {"error": "Session not found"}
     
-    except Exception as e:
-        return {"error": str(e)}
+    return await asyncio.wrap_future(registry.set_mute(pid, mute))
+
+@router.post("/batch")
+async def set_many(data: dict):
+    if registry is None:
+        return {"error": "pycaw not installed"}
+    
+    updates = data.get("updates")
+    if not isinstance(updates, list):
+        return {"error": "updates must be a list of {pid, volume?, mute?}"}
+    
+    return await asyncio.wrap_future(registry.set_many(updates))
+
+@router.get("/stats")
+async def get_mixer_stats():
+    if registry is None:
+        return {"error": "pycaw not installed"}
+    return registry.stats()
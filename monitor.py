@@ -0,0 +1,123 @@
+from collections import deque
+import asyncio
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+
+from dsp import AudioRing, PolyphaseResampler
+
+MONITOR_RATE = 16000
+MONITOR_INTERVAL = 0.05
+MONITOR_QUEUE_FRAMES = 8
+
+
+class MonitorListener:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.frames = deque(maxlen=MONITOR_QUEUE_FRAMES)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, frame: bytes):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+        self.wakeup.set()
+
+    async def run_sender(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.frames:
+                    await self.websocket.send_bytes(self.frames.popleft())
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass
+
+
+class MonitorStreamer:
+    # The audio callback only copies each output block into the ring (and only while someone listens);
+    # resampling, int16 conversion and fan-out happen here on the event loop.
+    def __init__(self, sample_rate, rate=MONITOR_RATE, interval=MONITOR_INTERVAL):
+        self.sample_rate = sample_rate
+        self.rate = rate
+        self.interval = interval
+        self.ring = AudioRing(sample_rate)
+        self.ring.active = False
+        self.listeners = set()
+        self.position = 0
+        self.resampler = None
+        self.task = None
+        self.frames = 0
+        self.skipped = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def attach(self, ring):
+        self.ring = ring
+        self.ring.active = bool(self.listeners)
+        self._reset()
+
+    def _reset(self):
+        self.position = self.ring.written
+        self.resampler = PolyphaseResampler(self.sample_rate, self.rate)
+
+    def _encode(self, block):
+        if self.rate != self.sample_rate:
+            block = self.resampler.process(block)
+        return (np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.listeners:
+                continue
+            try:
+                block, self.position, skipped = self.ring.read(self.position)
+                if skipped:
+                    self.skipped += skipped
+                if len(block) == 0:
+                    continue
+                frame = self._encode(block)
+                if not frame:
+                    continue
+                for listener in self.listeners:
+                    listener.push(frame)
+                self.frames += 1
+            except Exception as e:
+                print(f"[Monitor] Stream error: {e}")
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_json({"type": "format", "sample_rate": self.rate, "channels": 1, "encoding": "s16le"})
+        listener = MonitorListener(websocket)
+        if not self.listeners:
+            self._reset()
+        self.listeners.add(listener)
+        self.ring.active = True
+        sender = asyncio.create_task(listener.run_sender())
+        try:
+            while True:
+                await websocket.receive_text()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.listeners.discard(listener)
+            self.ring.active = bool(self.listeners)
+            sender.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "listeners": len(self.listeners),
+            "sample_rate": self.rate,
+            "frames": self.frames,
+            "skipped_samples": self.skipped,
+            "dropped": sum(listener.dropped for listener in self.listeners)
+        }
@@ -0,0 +1,293 @@
+import numpy as np
+from scipy import signal
+
+from control import CommandQueue
+from effects import ChainError, EFFECT_PRESETS, FRONT_END
+from processor import SAMPLE_RATE, BLOCK_SIZE, PROCESS_DTYPE
+
+ALL = slice(None)
+
+
+class BatchNode:
+    # Batched counterpart of EffectNode: state has one row per channel and process() handles a
+    # (rows x samples) block. Pointers and phases are shared, so every row advances together.
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE):
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.dtype = dtype
+
+    def reset_rows(self, rows):
+        pass
+
+    def process(self, block, rows):
+        raise NotImplementedError
+
+
+class BatchFilterNode(BatchNode):
+    def _filter(self, block, rows):
+        zi = self.zi if isinstance(rows, slice) else self.zi[rows]
+        out, zi = signal.lfilter(self.b, self.a, block, axis=1, zi=zi)
+        self.zi[rows] = zi
+        return out
+
+    def reset_rows(self, rows):
+        self.zi[rows] = 0
+
+
+class BatchHighPass(BatchFilterNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, cutoff=100):
+        super().__init__(channels, sample_rate, dtype)
+        self.b, self.a = signal.butter(4, cutoff / (sample_rate / 2), btype='highpass')
+        self.zi = np.zeros((channels, max(len(self.a), len(self.b)) - 1))
+
+    def process(self, block, rows):
+        block[:] = self._filter(block, rows)
+
+
+class BatchNoiseGate(BatchNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, threshold=0.005):
+        super().__init__(channels, sample_rate, dtype)
+        self.threshold = threshold
+
+    def process(self, block, rows):
+        rms = np.sqrt(np.einsum('ij,ij->i', block, block) / block.shape[1])
+        gain = np.where(rms < self.threshold, (rms / self.threshold) ** 2, 1.0)
+        block *= gain[:, None].astype(block.dtype)
+
+
+class BatchEcho(BatchNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, delay=0.4, feedback=0.4):
+        super().__init__(channels, sample_rate, dtype)
+        self.buffer = np.zeros((channels, sample_rate * 2), dtype=dtype)
+        self.scratch = np.zeros((channels, 0), dtype=dtype)
+        self.delay = max(1, min(int(delay * sample_rate), self.buffer.shape[1]))
+        self.feedback = feedback
+        self.ptr = 0
+
+    def reset_rows(self, rows):
+        self.buffer[rows] = 0
+
+    def process(self, block, rows):
+        # Same recurrence as DelayLine, one slice of at most D samples at a time, for all rows at once.
+        num_rows, num_samples = block.shape
+        size = self.buffer.shape[1]
+        if self.scratch.shape[1] < min(self.delay, num_samples):
+            self.scratch = np.zeros((self.channels, num_samples), dtype=self.dtype)
+        pos = 0
+        while pos < num_samples:
+            n = min(self.delay, num_samples - pos)
+            delayed = self.scratch[:num_rows, :n]
+            start = (self.ptr - self.delay) % size
+            first = min(n, size - start)
+            delayed[:, :first] = self.buffer[rows, start:start + first]
+            delayed[:, first:] = self.buffer[rows, :n - first]
+            delayed *= self.feedback
+            delayed += block[:, pos:pos + n]
+            first = min(n, size - self.ptr)
+            self.buffer[rows, self.ptr:self.ptr + first] = delayed[:, :first]
+            self.buffer[rows, :n - first] = delayed[:, first:]
+            block[:, pos:pos + n] = delayed
+            self.ptr = (self.ptr + n) % size
+            pos += n
+
+
+class BatchReverb(BatchNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, gain=0.7, mix=0.5):
+        super().__init__(channels, sample_rate, dtype)
+        delays = [int(0.0297 * sample_rate), int(0.0371 * sample_rate),
+                  int(0.0411 * sample_rate), int(0.0437 * sample_rate)]
+        self.buffers = [np.zeros((channels, d), dtype=dtype) for d in delays]
+        self.ptrs = [0] * len(delays)
+        self.gain = gain
+        self.mix = mix
+        self.wet = np.zeros((channels, 0), dtype=dtype)
+        self.tmp = np.zeros((channels, 0), dtype=dtype)
+
+    def reset_rows(self, rows):
+        for buffer in self.buffers:
+            buffer[rows] = 0
+
+    def process(self, block, rows):
+        num_rows, num_samples = block.shape
+        if self.wet.shape[1] != num_samples:
+            self.wet = np.zeros((self.channels, num_samples), dtype=self.dtype)
+            self.tmp = np.zeros((self.channels, num_samples), dtype=self.dtype)
+        wet = self.wet[:num_rows]
+        wet.fill(0)
+        for i, buffer in enumerate(self.buffers):
+            delay = buffer.shape[1]
+            ptr = self.ptrs[i]
+            pos = 0
+            while pos < num_samples:
+                n = min(delay - ptr, num_samples - pos)
+                delayed = buffer[rows, ptr:ptr + n]
+                wet[:, pos:pos + n] += delayed
+                tmp = self.tmp[:num_rows, :n]
+                np.multiply(delayed, self.gain, out=tmp)
+                tmp += block[:, pos:pos + n]
+                buffer[rows, ptr:ptr + n] = tmp
+                ptr = (ptr + n) % delay
+                pos += n
+            self.ptrs[i] = ptr
+        wet /= len(self.buffers)
+        wet *= self.mix
+        block *= 1 - self.mix
+        block += wet
+
+
+class BatchPitchShift(BatchNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, semitones=7):
+        super().__init__(channels, sample_rate, dtype)
+        self.semitones = semitones
+        self.buf_size = int(sample_rate * 0.2)
+        self.buffer = np.zeros((channels, self.buf_size), dtype=dtype)
+        self.write_ptr = 0
+        self.phase = 0.0
+
+    def reset_rows(self, rows):
+        self.buffer[rows] = 0
+
+    def _interpolate(self, history, write_indices, phases, delay_range):
+        pos = np.mod(write_indices - phases * delay_range, self.buf_size)
+        idx_f = pos.astype(np.int64)
+        idx_c = (idx_f + 1) % self.buf_size
+        # Weights are cast to the audio dtype before they scale it, exactly as PitchShiftNode does.
+        frac = (pos - idx_f).astype(self.dtype)
+        return history[:, idx_f] * (1 - frac) + history[:, idx_c] * frac
+
+    def process(self, block, rows):
+        # PitchShiftNode's dual-tap crossfade; the tap positions are shared, only the history differs per row.
+        factor = 2 ** (self.semitones / 12.0)
+        num_samples = block.shape[1]
+        delay_range = int(0.06 * self.sample_rate)
+
+        first = min(num_samples, self.buf_size - self.write_ptr)
+        self.buffer[rows, self.write_ptr:self.write_ptr + first] = block[:, :first]
+        self.buffer[rows, :num_samples - first] = block[:, first:]
+        self.write_ptr = (self.write_ptr + num_samples) % self.buf_size
+
+        phase_inc = (1.0 - factor) / delay_range
+        phases = np.mod(np.arange(num_samples) * phase_inc + self.phase, 1.0)
+        self.phase = (phases[-1] + phase_inc) % 1.0
+        phases2 = np.mod(phases + 0.5, 1.0)
+        write_indices = np.mod(np.arange(num_samples) + self.write_ptr - num_samples, self.buf_size)
+
+        history = self.buffer if isinstance(rows, slice) else self.buffer[rows]
+        val1 = self._interpolate(history, write_indices, phases, delay_range)
+        val2 = self._interpolate(history, write_indices, phases2, delay_range)
+        weights = (np.cos(phases * np.pi - np.pi / 2) ** 2).astype(self.dtype)
+        block[:] = val1 * weights + val2 * (1 - weights)
+
+
+class BatchRadio(BatchFilterNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE):
+        super().__init__(channels, sample_rate, dtype)
+        self.rng = np.random.default_rng()
+        self.b, self.a = signal.butter(4, [400 / (sample_rate / 2), 3000 / (sample_rate / 2)], btype='bandpass')
+        self.zi = np.zeros((channels, max(len(self.a), len(self.b)) - 1))
+
+    def process(self, block, rows):
+        processed = self._filter(block, rows)
+        processed += self.rng.standard_normal(processed.shape) * 0.005
+        processed *= 2
+        np.clip(processed, -0.7, 0.7, out=processed)
+        block[:] = processed
+
+
+class BatchDistortion(BatchNode):
+    def __init__(self, channels, sample_rate, dtype=PROCESS_DTYPE, gain=10):
+        super().__init__(channels, sample_rate, dtype)
+        self.gain = gain
+
+    def process(self, block, rows):
+        block *= self.gain
+        np.arctan(block, out=block)
+        block /= (np.pi / 2)
+
+
+BATCH_NODE_TYPES = {
+    "hpf": BatchHighPass,
+    "gate": BatchNoiseGate,
+    "echo": BatchEcho,
+    "pitch": BatchPitchShift,
+    "radio": BatchRadio,
+    "reverb": BatchReverb,
+    "distortion": BatchDistortion,
+}
+
+
+def build_batch_nodes(spec, channels, sample_rate, dtype=PROCESS_DTYPE):
+    nodes = []
+    for node_spec in spec:
+        node_cls = BATCH_NODE_TYPES.get(node_spec["type"])
+        if node_cls is None:
+            raise ChainError(f"node type has no batched version: {node_spec['type']}")
+        params = {k: float(v) for k, v in node_spec.items() if k != "type"}
+        nodes.append(node_cls(channels, sample_rate, dtype, **params))
+    return nodes
+
+
+class MultiChannelProcessor:
+    # One (channels x samples) pass per stage instead of one AudioProcessor per input. Channels that
+    # share an effect are processed together; a channel switching effects starts from clean state.
+    def __init__(self, channels, dtype=PROCESS_DTYPE, block_size=BLOCK_SIZE):
+        self.channels = channels
+        self.sample_rate = SAMPLE_RATE
+        self.dtype = dtype
+        self.front = build_batch_nodes(FRONT_END, channels, SAMPLE_RATE, dtype)
+        self.effect_nodes = {name: build_batch_nodes(spec[len(FRONT_END):], channels, SAMPLE_RATE, dtype)
+                             for name, spec in EFFECT_PRESETS.items()}
+        self.effects = ["none"] * channels
+        self.groups = []
+        self.work = np.zeros((channels, block_size), dtype=dtype)
+        self.commands = CommandQueue()
+
+    def set_effect(self, channel, effect):
+        if not 0 <= channel < self.channels:
+            raise ChainError(f"channel out of range: {channel}")
+        if effect not in self.effect_nodes:
+            raise ChainError(f"unknown effect: {effect}")
+        return self.commands.put((channel, effect))
+
+    def apply_commands(self):
+        changed = False
+        while True:
+            command = self.commands.get()
+            if command is None:
+                break
+            channel, effect = command
+            if self.effects[channel] != effect:
+                self.effects[channel] = effect
+                rows = np.array([channel])
+                for node in self.effect_nodes[effect]:
+                    node.reset_rows(rows)
+                changed = True
+        if changed:
+            self._regroup()
+
+    def _regroup(self):
+        groups = []
+        for effect in dict.fromkeys(self.effects):
+            nodes = self.effect_nodes[effect]
+            if not nodes:
+                continue
+            rows = np.array([i for i, e in enumerate(self.effects) if e == effect])
+            groups.append((nodes, ALL if len(rows) == self.channels else rows))
+        self.groups = groups
+
+    def process(self, audio_data):
+        # audio_data is (channels, samples); the returned work buffer is reused next block.
+        self.apply_commands()
+        if self.work.shape != audio_data.shape:
+            self.work = np.zeros(audio_data.shape, dtype=self.dtype)
+        x = self.work
+        x[:] = audio_data
+        for node in self.front:
+            node.process(x, ALL)
+        for nodes, rows in self.groups:
+            block = x if isinstance(rows, slice) else x[rows]
+            for node in nodes:
+                node.process(block, rows)
+            if not isinstance(rows, slice):
+                x[rows] = block
+        return x
@@ -0,0 +1,185 @@
+import itertools
+import os
+from time import perf_counter
+
+import numpy as np
+
+from control import CommandQueue
+from dsp import PCMStream, VoicePool
+from effects import ChainError, EchoNode, EFFECT_PRESETS, STAGE_SOUNDPAD, build_chain, build_front
+
+SAMPLE_RATE = 44100
+BLOCK_SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+BLOCK_SIZE = int(os.environ.get("AUDIOCART_BLOCK_SIZE", "2048"))
+if BLOCK_SIZE not in BLOCK_SIZES:
+    raise ValueError(f"AUDIOCART_BLOCK_SIZE must be one of {', '.join(map(str, BLOCK_SIZES))}, got {BLOCK_SIZE}")
+MAX_VOICES = 32
+OUTPUT_LIMIT = 0.9
+EFFECTS = tuple(EFFECT_PRESETS)
+PROCESS_DTYPE = np.float32
+
+
+class AudioProcessor:
+    def __init__(self, dtype=PROCESS_DTYPE, block_size=BLOCK_SIZE):
+        self.effect = "none"
+        self.sample_rate = SAMPLE_RATE
+        self.dtype = dtype
+        
+        # chain_specs is owned by request handlers, chains/chain by the audio thread.
+        self.chain_specs = dict(EFFECT_PRESETS)
+        self.front = build_front(SAMPLE_RATE, dtype)
+        self.chains = {name: build_chain(name, spec, SAMPLE_RATE, dtype, self.front)
+                       for name, spec in EFFECT_PRESETS.items()}
+        self.chain = self.chains["none"]
+        self.echo = self.chains["echo"].find(EchoNode)[0].line
+        
+        self.voices = VoicePool(MAX_VOICES, block_size)
+        self.prepare(block_size)
+        self.soundpad_volume = 0.7
+        self.soundpad_active = False
+        self.voice_ids = itertools.count(1)
+        self.last_soundpad_chunk = None
+        self.metrics = None
+        
+        # Request handlers never touch DSP state directly; the audio thread applies these at block start.
+        self.commands = CommandQueue()
+        self.command_handlers = {
+            "effect": self._apply_effect,
+            "define_chain": self._apply_define_chain,
+            "play": self.voices.play,
+            "stop": self._apply_stop,
+            "voice_volume": self.voices.set_volume,
+            "soundpad_volume": self._apply_soundpad_volume,
+            "echo": self._apply_echo_params,
+        }
+
+    def prepare(self, block_size):
+        # Only while the stream is stopped: reallocates every per-block buffer for the new size.
+        self.work = np.zeros(block_size, dtype=self.dtype)
+        self.soundpad_chunk = np.zeros(block_size, dtype=np.float32)
+        self.voices.prepare(block_size)
+        for chain in self.chains.values():
+            chain.prepare(block_size)
+
+    def post(self, name, *args):
+        return self.commands.put((name, args))
+
+    def apply_commands(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            name, args = command
+            self.command_handlers[name](*args)
+
+    def _apply_effect(self, effect):
+        chain = self.chains.get(effect)
+        if chain is not None:
+            self.chain = chain
+            self.effect = effect
+
+    def _apply_define_chain(self, chain):
+        self.chains[chain.name] = chain
+        if self.effect == chain.name:
+            self.chain = chain
+
+    def _apply_stop(self, voice_id):
+        if voice_id is None:
+            self.voices.stop_all()
+        else:
+            self.voices.stop(voice_id)
+
+    def _apply_soundpad_volume(self, volume):
+        self.soundpad_volume = volume
+
+    def _apply_echo_params(self, delay, feedback):
+        if delay is not None:
+            self.echo.set_delay(delay * self.sample_rate)
+        if feedback is not None:
+            self.echo.feedback = feedback
+
+    def set_effect(self, effect):
+        if effect not in self.chain_specs:
+            raise ChainError(f"Unknown effect: {effect}")
+        return self.post("effect", effect)
+
+    def compile_chain(self, name, spec):
+        # May decode impulse responses, so request handlers call it from a worker thread.
+        if name in EFFECT_PRESETS:
+            raise ChainError(f"Cannot redefine built-in effect: {name}")
+        chain = build_chain(name, spec, self.sample_rate, self.dtype, self.front)
+        chain.prepare(len(self.work))
+        return chain
+
+    def install_chain(self, chain):
+        if not self.post("define_chain", chain):
+            return False
+        self.chain_specs[chain.name] = chain.spec
+        return True
+
+    def define_chain(self, name, spec):
+        return self.install_chain(self.compile_chain(name, spec))
+
+    def set_soundpad_volume(self, volume):
+        return self.post("soundpad_volume", volume)
+
+    def play_sound(self, audio_data, peak=None, volume=1.0, loop=False, sound_id=None, voice_id=None):
+        if isinstance(audio_data, PCMStream):
+            # Streams are peak-normalized as they are resampled.
+            peak = 1.0 if peak is None else peak
+        else:
+            if len(audio_data.shape) > 1:
+                audio_data = np.mean(audio_data, axis=1)
+            audio_data = np.asarray(audio_data, dtype=np.float32)
+        if peak is None:
+            peak = np.max(np.abs(audio_data)) if len(audio_data) else 0
+        gain = 0.7 / peak if peak > 0 else 1.0
+        if voice_id is None:
+            voice_id = next(self.voice_ids)
+        if not self.post("play", audio_data, gain, volume, loop, sound_id, voice_id):
+            return None
+        return voice_id
+
+    def stop_sound(self, voice_id=None):
+        return self.post("stop", voice_id)
+
+    def set_voice_volume(self, voice_id, volume):
+        return self.post("voice_volume", voice_id, volume)
+
+    def get_voices(self):
+        return self.voices.voices()
+
+    def get_soundpad_chunk(self, num_samples):
+        if len(self.soundpad_chunk) != num_samples:
+            self.soundpad_chunk = np.zeros(num_samples, dtype=np.float32)
+        chunk = self.soundpad_chunk
+        chunk.fill(0)
+        self.soundpad_active = bool(self.voices.active.any())
+        if self.soundpad_active:
+            self.voices.mix(chunk)
+        chunk *= self.soundpad_volume
+        return chunk
+
+    def set_echo(self, delay=None, feedback=None):
+        return self.post("echo", delay, feedback)
+
+    def get_echo(self):
+        return {"delay": self.echo.delay / self.sample_rate, "feedback": self.echo.feedback}
+
+    def process(self, audio_data):
+        self.apply_commands()
+        metrics = self.metrics
+        if len(self.work) != len(audio_data):
+            self.work = np.zeros(len(audio_data), dtype=self.dtype)
+        x = self.work
+        x[:] = audio_data
+        self.chain.process(x, metrics)
+        
+        started = perf_counter()
+        soundpad_chunk = self.get_soundpad_chunk(len(x))
+        self.last_soundpad_chunk = soundpad_chunk
+        x += soundpad_chunk
+        if metrics is not None:
+            metrics.observe_stage(STAGE_SOUNDPAD, perf_counter() - started)
+            
+        return x
@@ -0,0 +1,132 @@
+import argparse
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from processor import AudioProcessor, SAMPLE_RATE, BLOCK_SIZE, OUTPUT_LIMIT, EFFECTS
+
+
+class RenderError(Exception):
+    pass
+
+
+def _decode_frames(raw, sample_width, channels):
+    if sample_width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif sample_width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        data = (packed[:, 0].astype(np.int32) | (packed[:, 1].astype(np.int32) << 8)
+                | (packed[:, 2].astype(np.int8).astype(np.int32) << 16))
+        data = data.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise RenderError(f"Unsupported sample width: {sample_width} bytes")
+    return data.reshape(-1, channels)
+
+
+def render_file(input_path, output_path, effect="none", block_size=BLOCK_SIZE):
+    processor = AudioProcessor(block_size=block_size)
+    processor.set_effect(effect)
+
+    try:
+        reader = wave.open(str(input_path), "rb")
+    except (wave.Error, EOFError) as e:
+        raise RenderError(f"Failed to read WAV: {e}")
+
+    with reader:
+        if reader.getframerate() != SAMPLE_RATE:
+            raise RenderError(f"expected {SAMPLE_RATE}Hz, got {reader.getframerate()}Hz")
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        total_frames = reader.getnframes()
+
+        with wave.open(str(output_path), "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(SAMPLE_RATE)
+
+            started = time.perf_counter()
+            while True:
+                raw = reader.readframes(block_size)
+                if not raw:
+                    break
+                block = _decode_frames(raw, sample_width, channels)
+                processed = processor.process(block[:, 0])
+                processed = np.clip(processed, -OUTPUT_LIMIT, OUTPUT_LIMIT)
+                writer.writeframes((processed * 32767).astype('<i2').tobytes())
+            elapsed = time.perf_counter() - started
+
+    duration = total_frames / SAMPLE_RATE
+    return {
+        "input": str(input_path),
+        "output": str(output_path),
+        "effect": effect,
+        "duration": duration,
+        "elapsed": elapsed,
+        "realtime_factor": duration / elapsed if elapsed > 0 else float("inf")
+    }
+
+
+def _render_job(args):
+    try:
+        return render_file(*args)
+    except RenderError as e:
+        return {"input": str(args[0]), "error": str(e)}
+
+
+def render_directory(input_dir, output_dir, effect="none", block_size=BLOCK_SIZE, jobs=None):
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [(path, output_dir / path.name, effect, block_size)
+             for path in sorted(input_dir.glob("*")) if path.suffix.lower() == ".wav"]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_render_job, tasks))
+
+
+def _print_result(result):
+    if "error" in result:
+        print(f"[Render] ❌ {result['input']}: {result['error']}")
+    else:
+        print(f"[Render] {result['input']} -> {result['output']}: "
+              f"{result['duration']:.1f}s audio in {result['elapsed']:.2f}s "
+              f"({result['realtime_factor']:.1f}x realtime)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render WAV files through AudioProcessor offline")
+    parser.add_argument("input", help="input WAV file or directory of WAV files")
+    parser.add_argument("output", help="output WAV file or directory")
+    parser.add_argument("--effect", default="none", choices=EFFECTS)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for directory input")
+    args = parser.parse_args(argv)
+
+    input_path = Path(args.input)
+    if input_path.is_dir():
+        started = time.perf_counter()
+        results = render_directory(input_path, args.output, args.effect, args.block_size, args.jobs)
+        elapsed = time.perf_counter() - started
+        for result in results:
+            _print_result(result)
+        duration = sum(r.get("duration", 0) for r in results)
+        print(f"[Render] {len(results)} files, {duration:.1f}s audio in {elapsed:.2f}s "
+              f"({duration / elapsed if elapsed > 0 else 0:.1f}x realtime)")
+        return 1 if any("error" in r for r in results) else 0
+
+    try:
+        _print_result(render_file(input_path, args.output, args.effect, args.block_size))
+    except RenderError as e:
+        _print_result({"input": str(input_path), "error": str(e)})
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
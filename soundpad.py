@@ -0,0 +1,390 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import os
+import struct
+import threading
+
+import numpy as np
+from scipy.io import wavfile
+
+from dsp import PCMStream, PolyphaseResampler, peak_pyramid
+
+SAMPLE_RATE = 44100
+SOUNDS_DIR = Path("sounds")
+PCM_DIR = SOUNDS_DIR / ".pcm"
+AUDIO_EXTENSIONS = [".mp3", ".wav", ".ogg", ".m4a"]
+RESAMPLE_CHUNK = 65536
+PEAKS_BASE = 256
+PEAKS_MAGIC = b"ACPK"
+PEAKS_HEADER = struct.Struct("<4sHHI")
+SOUND_CACHE_MB = int(os.environ.get("AUDIOCART_SOUND_CACHE_MB", "256"))
+DECODE_WORKERS = int(os.environ.get("AUDIOCART_DECODE_WORKERS", "2"))
+
+
+class SoundLoadError(Exception):
+    pass
+
+
+def find_sound_file(sound_id: str) -> Optional[Path]:
+    matching_files = list(SOUNDS_DIR.glob(f"{sound_id}.*"))
+    if not matching_files:
+        return None
+    return matching_files[0]
+
+
+def decode_source(file_path: Path):
+    # Mono float32 at the file's own sample rate.
+    sample_rate = SAMPLE_RATE
+
+    if file_path.suffix.lower() == '.wav':
+        try:
+            sample_rate, audio_data = wavfile.read(str(file_path))
+            print(f"[Soundpad] WAV loaded: {sample_rate}Hz, shape={audio_data.shape}, dtype={audio_data.dtype}")
+
+            if audio_data.dtype == np.int16:
+                audio_data = audio_data.astype(np.float32) / 32768.0
+            elif audio_data.dtype == np.int32:
+                audio_data = audio_data.astype(np.float32) / 2147483648.0
+            elif audio_data.dtype == np.uint8:
+                audio_data = (audio_data.astype(np.float32) - 128) / 128.0
+            else:
+                audio_data = audio_data.astype(np.float32)
+
+        except Exception as e:
+            print(f"[Soundpad] WAV read error: {e}")
+            raise SoundLoadError(f"Failed to read WAV: {str(e)}")
+
+    else:
+        try:
+            from pydub import AudioSegment
+            audio = AudioSegment.from_file(str(file_path))
+            audio = audio.set_channels(1)
+            sample_rate = audio.frame_rate
+            samples = np.array(audio.get_array_of_samples())
+
+            if audio.sample_width == 1:
+                audio_data = samples.astype(np.float32) / 128.0
+            elif audio.sample_width == 2:
+                audio_data = samples.astype(np.float32) / 32768.0
+            else:
+                audio_data = samples.astype(np.float32)
+
+            print(f"[Soundpad] Pydub loaded: {len(audio_data)} samples")
+
+        except ImportError:
+            raise SoundLoadError("Install pydub for mp3/ogg: pip install pydub")
+        except Exception as e:
+            print(f"[Soundpad] Pydub error: {e}")
+            raise SoundLoadError(f"Failed to decode audio: {str(e)}")
+
+    if len(audio_data.shape) > 1:
+        audio_data = np.mean(audio_data, axis=1)
+        print(f"[Soundpad] Converted to mono: {len(audio_data)} samples")
+
+    return np.ascontiguousarray(audio_data, dtype=np.float32), sample_rate
+
+
+def resample_stream(audio_data: np.ndarray, sample_rate: int, gain: float = 1.0, started=None) -> PCMStream:
+    # Converts to SAMPLE_RATE a chunk at a time; started(stream) runs once the first chunk is in,
+    # so a voice can begin playing while the rest of the file is still being converted.
+    resampler = PolyphaseResampler(sample_rate, SAMPLE_RATE)
+    stream = PCMStream(resampler.output_length(len(audio_data)))
+    for chunk in resample_chunks(audio_data, resampler):
+        chunk *= np.float32(gain)
+        stream.write(chunk)
+        if started is not None:
+            started(stream)
+            started = None
+    stream.close()
+    print(f"[Soundpad] Resampled {sample_rate}Hz -> {SAMPLE_RATE}Hz ({resampler.up}/{resampler.down}): "
+          f"{len(stream)} samples")
+    return stream
+
+
+def decode_sound(file_path: Path) -> np.ndarray:
+    audio_data, sample_rate = decode_source(file_path)
+    if sample_rate != SAMPLE_RATE:
+        audio_data = resample_stream(audio_data, sample_rate).data
+    return audio_data
+
+
+def resample_chunks(audio_data: np.ndarray, resampler: PolyphaseResampler, chunk_size: int = RESAMPLE_CHUNK):
+    for start in range(0, len(audio_data), chunk_size):
+        chunk = resampler.process(audio_data[start:start + chunk_size])
+        if len(chunk):
+            yield chunk
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+def sidecar_path(sound_id: str) -> Path:
+    return PCM_DIR / f"{sound_id}.npy"
+
+
+def _open_sidecar(sidecar: Path) -> np.ndarray:
+    data = np.load(sidecar, mmap_mode="r")
+    if data.dtype != np.float32 or data.ndim != 1:
+        raise ValueError(f"unexpected sidecar layout {data.dtype} {data.shape}")
+    return data
+
+
+def _write_sidecar(sidecar: Path, audio_data: np.ndarray):
+    PCM_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = sidecar.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, audio_data)
+    os.replace(tmp_path, sidecar)
+
+
+def analyze(audio_data: np.ndarray, sample_rate: int = SAMPLE_RATE) -> dict:
+    num_samples = len(audio_data)
+    peak = float(np.max(np.abs(audio_data))) if num_samples else 0.0
+    rms = float(np.sqrt(np.dot(audio_data, audio_data) / num_samples)) if num_samples else 0.0
+    seconds = num_samples / sample_rate
+    return {
+        "duration": f"{seconds:.1f}s",
+        "duration_seconds": seconds,
+        "peak": peak,
+        "rms": rms,
+        "loudness_db": float(20 * np.log10(rms)) if rms > 0 else None,
+        "gain": 1.0 / peak if peak > 0 else 1.0
+    }
+
+
+def peaks_path(sound_id: str) -> Path:
+    return PCM_DIR / f"{sound_id}.peaks"
+
+
+def _write_peaks(sound_id: str, levels: list):
+    # Header, per-level bin counts, then interleaved int8 (min, max) pairs, finest level first.
+    PCM_DIR.mkdir(parents=True, exist_ok=True)
+    path = peaks_path(sound_id)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(PEAKS_HEADER.pack(PEAKS_MAGIC, 1, len(levels), PEAKS_BASE))
+        f.write(np.array([len(level) for level in levels], dtype="<u4").tobytes())
+        for level in levels:
+            f.write(level.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_peaks(file_path: Path) -> Optional[list]:
+    path = peaks_path(file_path.stem)
+    try:
+        if path.stat().st_mtime_ns < file_path.stat().st_mtime_ns:
+            return None
+        raw = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        magic, version, num_levels, base = PEAKS_HEADER.unpack_from(raw)
+        if magic != PEAKS_MAGIC or version != 1 or base != PEAKS_BASE:
+            return None
+        offset = PEAKS_HEADER.size
+        counts = np.frombuffer(raw, dtype="<u4", count=num_levels, offset=offset)
+        offset += counts.nbytes
+        levels = []
+        for count in counts:
+            levels.append(np.frombuffer(raw, dtype=np.int8, count=int(count) * 2, offset=offset).reshape(-1, 2))
+            offset += int(count) * 2
+    except (struct.error, ValueError):
+        return None
+    return levels
+
+
+def build_peaks(sound_id: str, audio_data: np.ndarray) -> list:
+    levels = peak_pyramid(audio_data, PEAKS_BASE)
+    try:
+        _write_peaks(sound_id, levels)
+    except OSError as e:
+        print(f"[Soundpad] Peaks sidecar error for {sound_id}: {e}")
+    return levels
+
+
+def _decode_normalized(file_path: Path, started=None):
+    # Stats come from the source so the normalizing gain is known before the first chunk is resampled.
+    audio_data, sample_rate = decode_source(file_path)
+    stats = analyze(audio_data, sample_rate)
+    if sample_rate == SAMPLE_RATE:
+        audio_data *= np.float32(stats["gain"])
+    else:
+        audio_data = resample_stream(audio_data, sample_rate, stats["gain"], started).data
+    build_peaks(file_path.stem, audio_data)
+    return audio_data, stats
+
+
+def load_pcm(file_path: Path, started=None) -> np.ndarray:
+    # Sidecars hold peak-normalized float32 mono at SAMPLE_RATE, so playback never scans the whole file.
+    sidecar = sidecar_path(file_path.stem)
+    try:
+        if sidecar.stat().st_mtime_ns >= file_path.stat().st_mtime_ns:
+            return _open_sidecar(sidecar)
+    except (OSError, ValueError):
+        pass
+
+    audio_data, _ = _decode_normalized(file_path, started)
+    try:
+        _write_sidecar(sidecar, audio_data)
+        return _open_sidecar(sidecar)
+    except (OSError, ValueError) as e:
+        print(f"[Soundpad] PCM sidecar error for {file_path.name}: {e}")
+        return audio_data
+
+
+def ingest_sound(file_path: Path) -> dict:
+    # Runs in an ingestion worker process: one decode produces both the sidecar and the stats.
+    audio_data, stats = _decode_normalized(file_path)
+    try:
+        _write_sidecar(sidecar_path(file_path.stem), audio_data)
+    except OSError as e:
+        print(f"[Soundpad] PCM sidecar error for {file_path.name}: {e}")
+    return stats
+
+
+def sidecar_is_fresh(file_path: Path) -> bool:
+    try:
+        return sidecar_path(file_path.stem).stat().st_mtime_ns >= file_path.stat().st_mtime_ns
+    except OSError:
+        return False
+
+
+def remove_sidecar(sound_id: str):
+    for path in (sidecar_path(sound_id), peaks_path(sound_id)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[Soundpad] Failed to remove {path.name}: {e}")
+
+
+class SoundCache:
+    def __init__(self, max_bytes, workers=DECODE_WORKERS):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        # Decoding (ffmpeg, FFT resampling) runs here so callers on the event loop never block on it.
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        self.pending = {}
+        self.resolve = find_sound_file
+
+    def _drop(self, sound_id):
+        entry = self.entries.pop(sound_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[2].nbytes
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            _, (_, _, data) = self.entries.popitem(last=False)
+            self.total_bytes -= data.nbytes
+            self.evictions += 1
+
+    def _lookup(self, sound_id):
+        entry = self.entries.get(sound_id)
+        if entry is None:
+            return None
+        file_path, mtime, data = entry
+        try:
+            if file_path.stat().st_mtime_ns == mtime:
+                self.entries.move_to_end(sound_id)
+                self.hits += 1
+                return data
+        except OSError:
+            pass
+        self._drop(sound_id)
+        return None
+
+    def get(self, sound_id: str, started=None) -> Optional[np.ndarray]:
+        with self.lock:
+            data = self._lookup(sound_id)
+            if data is not None:
+                return data
+            self.misses += 1
+
+        file_path = self.resolve(sound_id)
+        if file_path is None:
+            return None
+        mtime = file_path.stat().st_mtime_ns
+        data = load_pcm(file_path, started)
+        data.flags.writeable = False
+
+        with self.lock:
+            self._drop(sound_id)
+            if data.nbytes <= self.max_bytes:
+                self.entries[sound_id] = (file_path, mtime, data)
+                self.total_bytes += data.nbytes
+                self._evict()
+        return data
+
+    def _load_job(self, sound_id, started, finished):
+        def start(data):
+            if not started.done():
+                started.set_result(data)
+
+        try:
+            data = self.get(sound_id, start)
+        except BaseException as e:
+            with self.lock:
+                self.pending.pop(sound_id, None)
+            for future in (started, finished):
+                if not future.done():
+                    future.set_exception(e)
+            return
+        with self.lock:
+            self.pending.pop(sound_id, None)
+        start(data)
+        finished.set_result(data)
+
+    def load(self, sound_id: str, stream: bool = False) -> Future:
+        # Concurrent requests for the same sound share one decode job. With stream=True the future
+        # resolves once the first chunk is resampled, to a PCMStream that keeps filling as it plays.
+        with self.lock:
+            data = self._lookup(sound_id)
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+                return future
+            job = self.pending.get(sound_id)
+            if job is None:
+                job = self.pending[sound_id] = (Future(), Future())
+                for future in job:
+                    # Running futures cannot be cancelled by one waiter on behalf of the others.
+                    future.set_running_or_notify_cancel()
+                self.pool.submit(self._load_job, sound_id, *job)
+            return job[0] if stream else job[1]
+
+    def invalidate(self, sound_id: str):
+        with self.lock:
+            self._drop(sound_id)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def set_max_bytes(self, max_bytes: int):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "decoding": len(self.pending)
+            }
+
+
+sound_cache = SoundCache(SOUND_CACHE_MB * 1024 * 1024)
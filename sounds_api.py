@@ -1,45 +1,40 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
-import os
-import json
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response
+import asyncio
 import shutil
 from pathlib import Path
+from typing import Optional
+
+from ingest import ingest_queue
+from library import library
+from soundpad import AUDIO_EXTENSIONS, PEAKS_BASE, SAMPLE_RATE, SoundLoadError, build_peaks, read_peaks, remove_sidecar, sound_cache
 
 router = APIRouter(prefix="/api/sounds", tags=["sounds"])
 
 SOUNDS_DIR = Path("sounds")
-METADATA_FILE = SOUNDS_DIR / "metadata.json"
-
-SOUNDS_DIR.mkdir(exist_ok=True)
+MAX_PAGE_SIZE = 1000
 
-def load_metadata() -> dict:
-    if METADATA_FILE.exists():
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+@router.get("")
+async def list_sounds(request: Request, cursor: Optional[str] = None, limit: Optional[int] = None, q: Optional[str] = None):
+    if limit is not None:
+        limit = max(1, min(MAX_PAGE_SIZE, limit))
+    etag = library.etag(cursor, limit, q)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    sounds, next_cursor, etag = library.page(cursor, limit, q)
+    return JSONResponse({"sounds": sounds, "next_cursor": next_cursor}, headers={"ETag": etag})
 
-def save_metadata(metadata: dict):
-    with open(METADATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+@router.get("/ingest")
+async def get_ingest_progress():
+    return ingest_queue.progress()
 
-@router.get("")
-async def list_sounds():
-    metadata = load_metadata()
-    sounds = []
-    
-    for file_path in SOUNDS_DIR.glob("*"):
-        if file_path.suffix.lower() in [".mp3", ".wav", ".ogg", ".m4a"]:
-            file_id = file_path.stem
-            meta = metadata.get(file_id, {})
-            sounds.append({
-                "id": file_id,
-                "filename": file_path.name,
-                "name": meta.get("name", file_id),
-                "emoji": meta.get("emoji", "🎵"),
-                "duration": meta.get("duration", "0.0s")
-            })
-    
-    return {"sounds": sounds}
+@router.post("/rescan")
+async def rescan_sounds():
+    await run_in_threadpool(library.load)
+    ingest_queue.submit_library()
+    return {"status": "ok", "count": len(library.ids)}
 
 @router.post("")
 async def add_sound(
@@ -47,11 +42,10 @@ async def add_sound(
     name: str = Form(...),
     emoji: str = Form("🎵")
 ):
-    allowed_extensions = [".mp3", ".wav", ".ogg", ".m4a"]
     file_ext = Path(file.filename).suffix.lower()
     
-    if file_ext not in allowed_extensions:
-        raise HTTPException(400, f"Invalid file type. Allowed: {', '.join(allowed_extensions)}")
+    if file_ext not in AUDIO_EXTENSIONS:
+        raise HTTPException(400, f"Invalid file type. Allowed: {', '.join(AUDIO_EXTENSIONS)}")
     
     import uuid
     file_id = str(uuid.uuid4())[:8]
@@ -59,14 +53,14 @@ async def add_sound(
     
     with open(file_path, "wb") as f:
         shutil.copyfileobj(file.file, f)
+    sound_cache.invalidate(file_id)
     
-    metadata = load_metadata()
-    metadata[file_id] = {
+    library.add(file_id, file_path, {
         "name": name,
         "emoji": emoji,
         "duration": "0.0s"
-    }
-    save_metadata(metadata)
+    })
+    queued = ingest_queue.submit(file_id, file_path)
     
     return {
         "status": "ok",
@@ -75,51 +69,76 @@ async def add_sound(
             "filename": file_path.name,
             "name": name,
             "emoji": emoji
-        }
+        },
+        "ingest": "queued" if queued else "deferred"
     }
 
 @router.put("/{sound_id}")
 async def update_sound(sound_id: str, data: dict):
-    metadata = load_metadata()
-    
-    if sound_id not in metadata:
-        matching_files = list(SOUNDS_DIR.glob(f"{sound_id}.*"))
-        if not matching_files:
-            raise HTTPException(404, "Sound not found")
-        metadata[sound_id] = {}
-    
-    if "name" in data:
-        metadata[sound_id]["name"] = data["name"]
-    if "emoji" in data:
-        metadata[sound_id]["emoji"] = data["emoji"]
-    
-    save_metadata(metadata)
+    fields = {key: data[key] for key in ("name", "emoji") if key in data}
+    if not library.update(sound_id, fields):
+        raise HTTPException(404, "Sound not found")
+    sound_cache.invalidate(sound_id)
     
     return {"status": "ok", "sound_id": sound_id}
 
 @router.delete("/{sound_id}")
 async def delete_sound(sound_id: str):
-    matching_files = list(SOUNDS_DIR.glob(f"{sound_id}.*"))
+    file_path = library.remove(sound_id)
     
-    if not matching_files:
+    if file_path is None:
         raise HTTPException(404, "Sound not found")
     
-    for file_path in matching_files:
-        file_path.unlink()
-    
-    metadata = load_metadata()
-    if sound_id in metadata:
-        del metadata[sound_id]
-        save_metadata(metadata)
+    file_path.unlink(missing_ok=True)
+    ingest_queue.forget(sound_id)
+    sound_cache.invalidate(sound_id)
+    remove_sidecar(sound_id)
     
     return {"status": "ok", "deleted": sound_id}
 
 @router.get("/{sound_id}/play")
 async def play_sound(sound_id: str):
-    matching_files = list(SOUNDS_DIR.glob(f"{sound_id}.*"))
+    file_path = library.find(sound_id)
     
-    if not matching_files:
+    if file_path is None:
         raise HTTPException(404, "Sound not found")
     
-    file_path = matching_files[0]
     return FileResponse(file_path, media_type="audio/mpeg")
+
+@router.get("/{sound_id}/peaks")
+async def get_sound_peaks(sound_id: str, level: Optional[int] = None, format: str = "json"):
+    file_path = library.find(sound_id)
+    
+    if file_path is None:
+        raise HTTPException(404, "Sound not found")
+    
+    levels = read_peaks(file_path)
+    if levels is None:
+        try:
+            audio_data = await asyncio.wrap_future(sound_cache.load(sound_id))
+        except SoundLoadError as e:
+            raise HTTPException(422, str(e))
+        levels = await run_in_threadpool(build_peaks, sound_id, audio_data)
+    
+    if level is None:
+        level = len(levels) - 1
+    if not 0 <= level < len(levels):
+        raise HTTPException(400, f"level must be between 0 and {len(levels) - 1}")
+    
+    peaks = levels[level]
+    samples_per_bin = PEAKS_BASE << level
+    if format == "binary":
+        return Response(peaks.tobytes(), media_type="application/octet-stream", headers={
+            "X-Peak-Levels": str(len(levels)),
+            "X-Samples-Per-Bin": str(samples_per_bin)
+        })
+    return {
+        "id": sound_id,
+        "level": level,
+        "levels": len(levels),
+        "samples_per_bin": samples_per_bin,
+        "sample_rate": SAMPLE_RATE,
+        "scale": 127,
+        "min": peaks[:, 0].tolist(),
+        "max": peaks[:, 1].tolist()
+    }
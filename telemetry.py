@@ -0,0 +1,120 @@
+from collections import deque
+import asyncio
+import json
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+TELEMETRY_HZ = 15
+MAX_OUTBOX = 64
+
+
+class TelemetryClient:
+    # Replies are queued in order; telemetry keeps only the newest frame, so a slow phone skips frames
+    # instead of building a backlog or slowing down anyone else.
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.outbox = deque()
+        self.latest = None
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, frame: str):
+        if self.latest is not None:
+            self.dropped += 1
+        self.latest = frame
+        self.wakeup.set()
+
+    def reply(self, message: str) -> bool:
+        if len(self.outbox) >= MAX_OUTBOX:
+            return False
+        self.outbox.append(message)
+        self.wakeup.set()
+        return True
+
+    async def run_sender(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.outbox:
+                    await self.websocket.send_text(self.outbox.popleft())
+                if self.latest is not None:
+                    frame, self.latest = self.latest, None
+                    await self.websocket.send_text(frame)
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass
+
+
+class Broadcaster:
+    def __init__(self, get_state, get_levels, rate=TELEMETRY_HZ):
+        self.get_state = get_state
+        self.get_levels = get_levels
+        self.interval = 1.0 / rate
+        self.clients = set()
+        self.task = None
+        self.last_state = None
+        self.frames = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        # One serialization per tick, shared by every client.
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if self.clients:
+                try:
+                    frame = {"type": "telemetry", "levels": self.get_levels()}
+                    state = self.get_state()
+                    encoded = json.dumps(state, ensure_ascii=False)
+                    if encoded != self.last_state:
+                        self.last_state = encoded
+                        frame["state"] = state
+                    message = json.dumps(frame, ensure_ascii=False)
+                    for client in self.clients:
+                        client.push(message)
+                    self.frames += 1
+                except Exception as e:
+                    print(f"[Telemetry] Broadcast error: {e}")
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            if loop.time() - next_tick > self.interval:
+                next_tick = loop.time()
+
+    async def serve(self, websocket: WebSocket, handle):
+        await websocket.accept()
+        client = TelemetryClient(websocket)
+        client.reply(json.dumps({"type": "state", "state": self.get_state()}, ensure_ascii=False))
+        self.clients.add(client)
+        sender = asyncio.create_task(client.run_sender())
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    message = json.loads(text)
+                    seq = message.get("seq")
+                    result = await handle(message)
+                except (ValueError, AttributeError) as e:
+                    seq, result = None, {"status": "error", "message": f"Bad message: {e}"}
+                if not client.reply(json.dumps({"type": "reply", "seq": seq, **result}, ensure_ascii=False)):
+                    await websocket.close(code=1008)
+                    break
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "frames": self.frames,
+            "dropped": sum(client.dropped for client in self.clients)
+        }
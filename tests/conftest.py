@@ -0,0 +1,37 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+# The modules are flat in the repo root; tests run headless against the clock-driven null backend.
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("AUDIOCART_AUDIO_BACKEND", "null")
+os.environ.setdefault("AUDIOCART_MIXER_BACKEND", "fake")
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    # main resolves sounds/ and static/ against the working directory, so it runs from a scratch copy.
+    workdir = tmp_path_factory.mktemp("server")
+    (workdir / "static").symlink_to(ROOT / "static", target_is_directory=True)
+    (workdir / "sounds").mkdir()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    import main
+    main.library.load()
+    yield main
+    main.engine.stop()
+    os.chdir(cwd)
+
+
+def add_sound(server, sound_id, seconds, sample_rate=44100):
+    rng = np.random.default_rng(len(sound_id))
+    audio = (0.3 * rng.standard_normal(int(seconds * sample_rate))).astype(np.float32)
+    path = server.library.sounds_dir / f"{sound_id}.wav"
+    wavfile.write(path, sample_rate, audio)
+    server.library.add(sound_id, path, {"name": sound_id})
+    return path
@@ -0,0 +1,147 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from audio_io import NullBackend
+from dsp import AudioRing
+from engine import AudioEngine
+from metrics import AudioMetrics
+from processor import AudioProcessor, BLOCK_SIZES, EFFECTS, SAMPLE_RATE
+
+BLOCK = 2048
+RESIZED = 512
+WARMUP_BLOCKS = 20
+MEASURED_BLOCKS = 50
+# Room for Python-level objects (floats, tuples); smaller than any per-block array.
+SLACK_BYTES = 4096
+
+
+def numpy_traces(snapshot):
+    return snapshot.filter_traces([tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)])
+
+
+def block_peak(step, blocks=MEASURED_BLOCKS):
+    # Largest transient growth of traced memory during a single call.
+    peak = 0
+    for _ in range(blocks):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        step()
+        _, block_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, block_peak - current)
+    return peak
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def make_engine(effect):
+    processor = AudioProcessor(block_size=BLOCK)
+    processor.metrics = AudioMetrics()
+    engine = AudioEngine(NullBackend(SAMPLE_RATE, BLOCK), processor, processor.metrics, AudioRing(SAMPLE_RATE))
+    processor.set_effect(effect)
+    sound = (0.1 * np.random.default_rng(0).standard_normal(SAMPLE_RATE)).astype(np.float32)
+    processor.play_sound(sound, loop=True)
+    processor.play_sound(sound[:BLOCK * 3], loop=False)
+    return engine
+
+
+@pytest.fixture
+def preallocated_lfilter(monkeypatch):
+    # scipy's lfilter has no out= parameter, so its result is the one temporary the hot path is
+    # allowed. It is swapped for a stand-in with a fixed output buffer so everything else shows up.
+    outputs = {block_size: np.empty(block_size) for block_size in BLOCK_SIZES}
+
+    def lfilter(b, a, x, zi):
+        out = outputs[len(x)]
+        out[:] = x
+        return out, zi
+
+    monkeypatch.setattr("effects.signal.lfilter", lfilter)
+
+
+@pytest.mark.parametrize("effect", EFFECTS)
+def test_audio_callback_allocates_nothing_in_steady_state(traced, preallocated_lfilter, effect):
+    engine = make_engine(effect)
+    indata = (0.1 * np.random.default_rng(1).standard_normal((BLOCK, 2))).astype(np.float32)
+    outdata = np.zeros((BLOCK, 2), dtype=np.float32)
+    callback = lambda: engine.audio_callback(indata, outdata, BLOCK, None, None)
+    for _ in range(WARMUP_BLOCKS):
+        callback()
+
+    before = numpy_traces(tracemalloc.take_snapshot())
+    peak = block_peak(callback)
+    after = numpy_traces(tracemalloc.take_snapshot())
+
+    growth = after.compare_to(before, "traceback")
+    assert sum(stat.count_diff for stat in growth) == 0
+    assert sum(stat.size_diff for stat in growth) == 0
+    assert peak <= SLACK_BYTES
+
+
+@pytest.mark.parametrize("effect", EFFECTS)
+def test_first_blocks_after_resize_allocate_nothing(traced, preallocated_lfilter, effect):
+    # Every buffer is sized by prepare() while the stream is stopped, not by the first callbacks.
+    engine = make_engine(effect)
+    engine.audio_callback(np.zeros((BLOCK, 2), dtype=np.float32), np.zeros((BLOCK, 2), dtype=np.float32), BLOCK, None, None)
+    engine._resize(RESIZED, engine.backend.latency)
+    indata = (0.1 * np.random.default_rng(1).standard_normal((RESIZED, 2))).astype(np.float32)
+    outdata = np.zeros((RESIZED, 2), dtype=np.float32)
+    monitor = np.zeros((RESIZED, 2), dtype=np.float32)
+
+    def callbacks():
+        engine.audio_callback(indata, outdata, RESIZED, None, None)
+        engine.monitor_callback(monitor, RESIZED, None, None)
+
+    before = numpy_traces(tracemalloc.take_snapshot())
+    peak = block_peak(callbacks, blocks=8)
+    after = numpy_traces(tracemalloc.take_snapshot())
+
+    assert engine.soundpad_monitor.primed
+    # Buffers sized for the old block are released along the way; nothing may take their place.
+    growth = after.compare_to(before, "traceback")
+    assert [stat for stat in growth if stat.size_diff > 0] == []
+    assert peak <= SLACK_BYTES
+
+
+@pytest.mark.parametrize("effect", EFFECTS)
+def test_process_stays_float32(effect):
+    engine = make_engine(effect)
+    processor = engine.processor
+    block = np.zeros(BLOCK, dtype=np.float32)
+    out = processor.process(block)
+    assert out.dtype == np.float32
+    assert out is processor.process(block)
+    assert processor.last_soundpad_chunk.dtype == np.float32
+
+
+# Tap positions, crossfade weights and filter coefficients are control data and stay float64.
+CONTROL_ARRAYS = {"ramp", "phases", "phases2", "write_indices", "pos", "frac", "weights", "b", "a", "zi", "response"}
+
+
+def audio_buffers(chain):
+    for node in chain.nodes:
+        for name, value in vars(node).items():
+            if isinstance(value, np.ndarray) and value.dtype.kind == "f" and name not in CONTROL_ARRAYS:
+                yield f"{type(node).__name__}.{name}", value
+
+
+def test_node_buffers_use_processing_dtype():
+    from impulses import impulse_store
+    impulse_store.register("dtype-test", np.random.default_rng(2).standard_normal(4096))
+    processor = AudioProcessor(block_size=BLOCK)
+    chains = list(processor.chains.values())
+    chains.append(processor.compile_chain("conv", [{"type": "convolution", "ir": "dtype-test"}]))
+    block = (0.1 * np.random.default_rng(3).standard_normal(BLOCK)).astype(np.float32)
+    for chain in chains:
+        chain.process(block.copy())
+        buffers = dict(audio_buffers(chain))
+        if chain.name in ("pitch_up", "pitch_down", "radio", "conv"):
+            assert buffers
+        for name, buf in buffers.items():
+            assert buf.dtype == np.float32, name
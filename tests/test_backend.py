@@ -0,0 +1,40 @@
+import threading
+import time
+
+from audio_io import NullBackend
+
+SAMPLE_RATE = 44100
+BLOCK = 512
+
+
+def test_restart_after_slow_halt_keeps_runs_apart():
+    # The first run's callback outlasts halt()'s join; starting again must not revive it.
+    backend = NullBackend(SAMPLE_RATE, BLOCK)
+    release = threading.Event()
+    first_monitor = []
+
+    def stuck_callback(indata, outdata, frames, time_info, status):
+        release.wait(5)
+
+    backend.start(stuck_callback, lambda *args: first_monitor.append(1))
+    time.sleep(0.05)
+    first = backend.thread
+    backend.halt()
+    assert first.is_alive()
+    assert backend.thread is first
+
+    second_blocks = []
+    backend.start(lambda indata, *args: second_blocks.append(indata), lambda *args: None)
+    second = backend.thread
+    assert second is not first
+    release.set()
+    first.join(1.0)
+    assert not first.is_alive()
+    assert first_monitor == []
+
+    time.sleep(0.05)
+    assert second.is_alive()
+    assert second_blocks
+    backend.halt()
+    assert backend.thread is None
+    assert not second.is_alive()
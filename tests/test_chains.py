@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from processor import AudioProcessor, SAMPLE_RATE
+
+BLOCK = 2048
+
+
+class ReferenceProcessor:
+    # The single-state AudioProcessor from before effect chains, minus the soundpad. Radio is left
+    # out because it adds unseeded noise.
+    def __init__(self):
+        self.effect = "none"
+        self.sample_rate = SAMPLE_RATE
+
+        self.hpf_b, self.hpf_a = signal.butter(4, 100 / (SAMPLE_RATE / 2), btype='highpass')
+        self.hpf_zi = np.zeros((max(len(self.hpf_a), len(self.hpf_b)) - 1,))
+
+        self.echo_buffer = np.zeros(SAMPLE_RATE * 2)
+        self.echo_ptr = 0
+
+        self.reverb_delays = [int(0.0297 * SAMPLE_RATE), int(0.0371 * SAMPLE_RATE),
+                             int(0.0411 * SAMPLE_RATE), int(0.0437 * SAMPLE_RATE)]
+        self.reverb_buffers = [np.zeros(d) for d in self.reverb_delays]
+        self.reverb_ptrs = [0] * 4
+
+        self.pitch_buf_size = int(SAMPLE_RATE * 0.2)
+        self.pitch_buffer = np.zeros(self.pitch_buf_size)
+        self.pitch_write_ptr = 0
+        self.pitch_phase = 0.0
+
+    def apply_hpf(self, audio_data):
+        processed, self.hpf_zi = signal.lfilter(self.hpf_b, self.hpf_a, audio_data, zi=self.hpf_zi)
+        return processed
+
+    def apply_noise_gate(self, audio_data, threshold=0.005):
+        rms = np.sqrt(np.mean(audio_data**2))
+        if rms < threshold:
+            gain = (rms / threshold) ** 2
+            return audio_data * gain
+        return audio_data
+
+    def apply_echo(self, audio_data, delay=0.4, feedback=0.4):
+        delay_samples = int(delay * self.sample_rate)
+        output = np.zeros_like(audio_data)
+        for i in range(len(audio_data)):
+            read_ptr = (self.echo_ptr - delay_samples) % len(self.echo_buffer)
+            delayed_sample = self.echo_buffer[read_ptr]
+            output[i] = audio_data[i] + delayed_sample * feedback
+            self.echo_buffer[self.echo_ptr] = audio_data[i] + delayed_sample * feedback
+            self.echo_ptr = (self.echo_ptr + 1) % len(self.echo_buffer)
+        return output
+
+    def apply_pitch_shift_dual_delay(self, audio_data, semitones):
+        factor = 2 ** (semitones / 12.0)
+        rate = 1.0 - factor
+        num_samples = len(audio_data)
+
+        delay_range = int(0.06 * self.sample_rate)
+
+        end_ptr = self.pitch_write_ptr + num_samples
+        if end_ptr <= self.pitch_buf_size:
+            self.pitch_buffer[self.pitch_write_ptr:end_ptr] = audio_data
+        else:
+            part1 = self.pitch_buf_size - self.pitch_write_ptr
+            self.pitch_buffer[self.pitch_write_ptr:] = audio_data[:part1]
+            self.pitch_buffer[:num_samples - part1] = audio_data[part1:]
+        self.pitch_write_ptr = (self.pitch_write_ptr + num_samples) % self.pitch_buf_size
+
+        phase_inc = rate / delay_range
+        phases = (self.pitch_phase + phase_inc * np.arange(num_samples)) % 1.0
+        self.pitch_phase = (phases[-1] + phase_inc) % 1.0
+
+        phases2 = (phases + 0.5) % 1.0
+
+        write_indices = (self.pitch_write_ptr - num_samples + np.arange(num_samples)) % self.pitch_buf_size
+
+        pos1 = (write_indices - phases * delay_range) % self.pitch_buf_size
+        pos2 = (write_indices - phases2 * delay_range) % self.pitch_buf_size
+
+        def get_interpolated(pos):
+            idx_f = pos.astype(int)
+            idx_c = (idx_f + 1) % self.pitch_buf_size
+            frac = pos - idx_f
+            return (1 - frac) * self.pitch_buffer[idx_f] + frac * self.pitch_buffer[idx_c]
+
+        val1 = get_interpolated(pos1)
+        val2 = get_interpolated(pos2)
+
+        weights1 = np.cos(phases * np.pi - np.pi/2) ** 2
+        weights2 = 1.0 - weights1
+
+        return val1 * weights1 + val2 * weights2
+
+    def apply_reverb(self, audio_data):
+        output = np.zeros_like(audio_data)
+        gain = 0.7
+        for i in range(len(audio_data)):
+            sample_out = 0
+            for j in range(4):
+                delayed_sample = self.reverb_buffers[j][self.reverb_ptrs[j]]
+                self.reverb_buffers[j][self.reverb_ptrs[j]] = audio_data[i] + delayed_sample * gain
+                self.reverb_ptrs[j] = (self.reverb_ptrs[j] + 1) % self.reverb_delays[j]
+                sample_out += delayed_sample
+            output[i] = sample_out / 4
+        return audio_data * 0.5 + output * 0.5
+
+    def apply_distortion(self, audio_data, gain=10):
+        return np.arctan(audio_data * gain) / (np.pi / 2)
+
+    def process(self, audio_data):
+        x = self.apply_hpf(audio_data)
+        x = self.apply_noise_gate(x)
+
+        if self.effect == "echo":
+            x = self.apply_echo(x)
+        elif self.effect == "pitch_up":
+            x = self.apply_pitch_shift_dual_delay(x, 7)
+        elif self.effect == "pitch_down":
+            x = self.apply_pitch_shift_dual_delay(x, -5)
+        elif self.effect == "reverb":
+            x = self.apply_reverb(x)
+        elif self.effect == "distortion":
+            x = self.apply_distortion(x)
+        return x
+
+
+# The reference shares one pitch buffer between pitch_up and pitch_down, so each run switches to
+# only one of them; everything else keeps per-effect state across switches, as before.
+SWITCHES = ["none", "echo", "reverb", "pitch", "distortion", "echo", "none",
+            "reverb", "pitch", "distortion", "echo", "reverb"]
+
+
+def input_blocks(count, seed=0):
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for i in range(count):
+        # Every third block is quiet enough for the gate to close.
+        level = 0.001 if i % 3 == 2 else 0.3
+        blocks.append(level * rng.standard_normal(BLOCK))
+    return blocks
+
+
+@pytest.mark.parametrize("pitch", ["pitch_up", "pitch_down"])
+@pytest.mark.parametrize("blocks_per_effect", [1, 3])
+def test_effect_switches_match_reference(blocks_per_effect, pitch):
+    reference = ReferenceProcessor()
+    processor = AudioProcessor(dtype=np.float64, block_size=BLOCK)
+    blocks = input_blocks(len(SWITCHES) * blocks_per_effect)
+    for i, block in enumerate(blocks):
+        effect = SWITCHES[i // blocks_per_effect].replace("pitch", pitch)
+        reference.effect = effect
+        processor.set_effect(effect)
+        expected = reference.process(block)
+        np.testing.assert_allclose(processor.process(block), expected, rtol=0, atol=1e-9,
+                                   err_msg=f"block {i} ({effect})")
+
+
+def test_presets_share_front_end():
+    processor = AudioProcessor(dtype=np.float64, block_size=BLOCK)
+    for chain in processor.chains.values():
+        assert chain.nodes[:len(processor.front)] == processor.front
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+import soundpad
+from conftest import add_sound
+
+DECODE_SECONDS = 1.5
+PROBE_INTERVAL = 0.02
+MAX_PROBE_SECONDS = 0.25
+
+
+@pytest.fixture
+def slow_decode(monkeypatch):
+    # Stands in for ffmpeg on a long mp3: the decode takes seconds but only blocks its own thread.
+    calls = []
+    decode_source = soundpad.decode_source
+
+    def decode(file_path):
+        calls.append(threading.current_thread().name)
+        time.sleep(DECODE_SECONDS)
+        return decode_source(file_path)
+
+    monkeypatch.setattr(soundpad, "decode_source", decode)
+    return calls
+
+
+async def timed(client, method, url, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    assert response.status_code == 200
+    return time.perf_counter() - started, response.json()
+
+
+async def probe_while(client, task):
+    latencies = []
+    probes = [("POST", "/set_effect", {"json": {"effect": "echo"}}),
+              ("GET", "/api/mixer", {}),
+              ("GET", "/api/sounds", {}),
+              ("GET", "/api/soundpad/status", {})]
+    while not task.done():
+        for method, url, kwargs in probes:
+            latency, _ = await timed(client, method, url, **kwargs)
+            latencies.append(latency)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+def test_other_endpoints_stay_responsive_while_a_large_file_decodes(server, slow_decode):
+    # One event loop serves everything, so any blocking decode would show up in the probe latencies.
+    add_sound(server, "decafbad", 60.0, sample_rate=48000)
+    server.sound_cache.invalidate("decafbad")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            idle = await probe_while(client, asyncio.create_task(asyncio.sleep(0.2)))
+            started = time.perf_counter()
+            plays = asyncio.gather(*(timed(client, "POST", "/api/soundpad/play/decafbad") for _ in range(3)))
+            busy = await probe_while(client, plays)
+            return idle, busy, time.perf_counter() - started, plays.result()
+
+    idle, busy, elapsed, plays = asyncio.run(scenario())
+
+    assert elapsed >= DECODE_SECONDS
+    assert all(result["status"] == "ok" for _, result in plays)
+    assert len(slow_decode) == 1
+    assert slow_decode[0].startswith("decode")
+    assert len(busy) >= DECODE_SECONDS / MAX_PROBE_SECONDS
+    assert max(busy) < MAX_PROBE_SECONDS
+    assert max(busy) < max(idle) + MAX_PROBE_SECONDS
+    server.processor.stop_sound()
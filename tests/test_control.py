@@ -0,0 +1,111 @@
+import asyncio
+import gc
+import itertools
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import add_sound
+from processor import EFFECTS, SAMPLE_RATE
+
+STRESS_SECONDS = 3.0
+STRESS_CLIENTS = 8
+
+
+@pytest.fixture(scope="module")
+def client(server):
+    add_sound(server, "c0ffee01", 2.0)
+    server.engine.start()
+    return TestClient(server.app)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def voice(server, voice_id):
+    return next((v for v in server.processor.get_voices() if v["voice_id"] == voice_id), None)
+
+
+def test_stop_right_after_play(server, client):
+    voice_id = client.post("/api/soundpad/play/c0ffee01?loop=true").json()["voice_id"]
+    assert client.post(f"/api/soundpad/voices/{voice_id}/stop").json()["status"] == "ok"
+    assert wait_for(lambda: server.processor.get_voices() == [])
+
+
+def test_volume_right_after_play(server, client):
+    voice_id = client.post("/api/soundpad/play/c0ffee01?loop=true").json()["voice_id"]
+    response = client.post(f"/api/soundpad/voices/{voice_id}/volume", json={"volume": 0.25}).json()
+    assert response["status"] == "ok"
+    assert wait_for(lambda: voice(server, voice_id) is not None and voice(server, voice_id)["volume"] == 0.25)
+    client.post("/api/soundpad/stop")
+
+
+def test_failed_resize_keeps_the_stream_running(server, client, monkeypatch):
+    from effects import ChainError, RadioNode
+
+    def prepare(self, block_size):
+        raise ChainError(f"cannot prepare {block_size}")
+
+    metrics = server.engine.metrics
+    block_size = server.engine.backend.block_size
+    monkeypatch.setattr(RadioNode, "prepare", lambda self, n: n == block_size or prepare(self, n))
+    response = client.post("/api/audio/config", json={"block_size": 512}).json()
+
+    assert response["status"] == "error"
+    assert server.engine.backend.block_size == block_size
+    assert server.engine.audio.running
+    blocks = metrics.blocks
+    assert wait_for(lambda: metrics.blocks > blocks + 2)
+
+
+def test_callback_jitter_under_endpoint_load(server, client):
+    # Concurrent clients hammer every control endpoint on one event loop, as uvicorn serves them,
+    # while the null backend drives the callback at block cadence; no callback may start a block late.
+    metrics = server.engine.metrics
+    period = server.engine.backend.block_size / SAMPLE_RATE
+    errors = []
+
+    async def hammer(http, worker, deadline):
+        effects = itertools.cycle(EFFECTS)
+        while time.monotonic() < deadline:
+            responses = [await http.post("/set_effect", json={"effect": next(effects)})]
+            voice_id = (await http.post("/api/soundpad/play/c0ffee01")).json().get("voice_id")
+            responses.append(await http.post(f"/api/soundpad/voices/{voice_id}/volume", json={"volume": 0.5}))
+            responses.append(await http.post(f"/api/soundpad/voices/{voice_id}/stop"))
+            responses.append(await http.post("/api/soundpad/volume", json={"volume": 0.6}))
+            responses.append(await http.post("/api/echo", json={"delay": 0.1 + worker / 10, "feedback": 0.3}))
+            errors.extend(r.json() for r in responses if r.json().get("status") != "ok")
+
+    async def stress():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            deadline = time.monotonic() + STRESS_SECONDS
+            await asyncio.gather(*(hammer(http, i, deadline) for i in range(STRESS_CLIENTS)))
+
+    # A full collection over everything earlier tests left behind stalls every thread for tens of
+    # milliseconds; that is the collector, not the control path, so it happens before the window.
+    gc.collect()
+    gc.freeze()
+    assert wait_for(lambda: metrics.blocks > 2)
+    time.sleep(2 * period)
+    blocks, late = metrics.blocks, metrics.xruns[2]
+    jitter_count = metrics.jitter.count
+    metrics.jitter.max = 0.0
+    try:
+        asyncio.run(stress())
+    finally:
+        gc.unfreeze()
+
+    assert errors == []
+    assert metrics.blocks - blocks >= 0.8 * STRESS_SECONDS / period
+    assert metrics.jitter.count > jitter_count
+    assert metrics.jitter.max < period
+    assert metrics.xruns[2] == late
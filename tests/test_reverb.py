@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from dsp import CombReverb
+from effects import ReverbNode
+from processor import SAMPLE_RATE
+
+DELAYS = [int(0.0297 * SAMPLE_RATE), int(0.0371 * SAMPLE_RATE),
+          int(0.0411 * SAMPLE_RATE), int(0.0437 * SAMPLE_RATE)]
+
+
+class ReferenceReverb:
+    # AudioProcessor.apply_reverb as it was before the comb engine: one sample at a time.
+    def __init__(self):
+        self.reverb_delays = list(DELAYS)
+        self.reverb_buffers = [np.zeros(d) for d in self.reverb_delays]
+        self.reverb_ptrs = [0] * 4
+
+    def apply_reverb(self, audio_data):
+        output = np.zeros_like(audio_data)
+        gain = 0.7
+        for i in range(len(audio_data)):
+            sample_out = 0
+            for j in range(4):
+                delayed_sample = self.reverb_buffers[j][self.reverb_ptrs[j]]
+                self.reverb_buffers[j][self.reverb_ptrs[j]] = audio_data[i] + delayed_sample * gain
+                self.reverb_ptrs[j] = (self.reverb_ptrs[j] + 1) % self.reverb_delays[j]
+                sample_out += delayed_sample
+            output[i] = sample_out / 4
+        return audio_data * 0.5 + output * 0.5
+
+
+def signal_blocks(block_sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    return [0.3 * rng.standard_normal(n) for n in block_sizes]
+
+
+@pytest.mark.parametrize("block_sizes", [
+    [2048] * 6,
+    [64] * 40,
+    [1, 7, 1309, 5000, 2048, 3, 1927],
+])
+def test_comb_reverb_matches_per_sample_loop(block_sizes):
+    reference = ReferenceReverb()
+    reverb = CombReverb(DELAYS, gain=0.7, mix=0.5)
+    for block in signal_blocks(block_sizes):
+        expected = reference.apply_reverb(block.copy())
+        np.testing.assert_array_equal(reverb.process(block.copy()), expected)
+
+
+def test_reverb_node_in_place_matches_per_sample_loop():
+    reference = ReferenceReverb()
+    node = ReverbNode(SAMPLE_RATE)
+    node.prepare(2048)
+    for block in signal_blocks([2048] * 6, seed=1):
+        expected = reference.apply_reverb(block.copy())
+        node.process(block)
+        np.testing.assert_array_equal(block, expected)
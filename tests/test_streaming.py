@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+from scipy.io import wavfile
+
+import soundpad
+from dsp import PCMStream
+from processor import AudioProcessor
+from soundpad import SoundCache
+
+BLOCK = 2048
+SOURCE_RATE = 48000
+# Unit peak, the soundpad's default volume and AudioProcessor's 0.7 headroom.
+PLAYBACK_GAIN = np.float32(0.7) * np.float32(0.7)
+
+
+def test_playback_starts_before_resampling_finishes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "slow.wav"
+    audio = (0.3 * np.random.default_rng(0).standard_normal(SOURCE_RATE * 4)).astype(np.float32)
+    wavfile.write(path, SOURCE_RATE, audio)
+
+    # Everything after the first chunk waits until the test has played what is ready so far.
+    gate = threading.Event()
+    resample_chunks = soundpad.resample_chunks
+
+    def gated(audio_data, resampler, chunk_size=soundpad.RESAMPLE_CHUNK):
+        for i, chunk in enumerate(resample_chunks(audio_data, resampler, chunk_size)):
+            yield chunk
+            if i == 0:
+                assert gate.wait(10)
+
+    monkeypatch.setattr(soundpad, "resample_chunks", gated)
+    cache = SoundCache(64 * 1024 * 1024, workers=1)
+    cache.resolve = lambda sound_id: path
+    try:
+        stream = cache.load("slow", stream=True).result(timeout=10)
+        finished = cache.load("slow")
+        assert isinstance(stream, PCMStream)
+        assert not stream.done.is_set()
+        assert not finished.done()
+        ready = stream.ready
+        assert 0 < ready < len(stream)
+
+        processor = AudioProcessor(block_size=BLOCK)
+        voice_id = processor.play_sound(stream)
+        silence = np.zeros(BLOCK, dtype=np.float32)
+        played = []
+        for _ in range(-(-ready // BLOCK) + 2):
+            processor.process(silence)
+            played.append(processor.last_soundpad_chunk.copy())
+        played = np.concatenate(played)
+
+        # The ready part plays as soon as it is there; past it the voice holds instead of ending.
+        np.testing.assert_allclose(played[:ready], stream.data[:ready] * PLAYBACK_GAIN, rtol=1e-6, atol=1e-7)
+        assert not played[ready:].any()
+        assert [v["voice_id"] for v in processor.get_voices()] == [voice_id]
+
+        gate.set()
+        data = finished.result(timeout=10)
+        assert stream.done.is_set()
+        np.testing.assert_array_equal(stream.data, data)
+        # Normalized by the source peak, so the gain is known before the first chunk.
+        gain = np.float32(1.0 / float(np.max(np.abs(audio))))
+        np.testing.assert_array_equal(data, soundpad.decode_sound(path) * gain)
+
+        rest = []
+        while processor.get_voices():
+            processor.process(silence)
+            rest.append(processor.last_soundpad_chunk.copy())
+        # The voice picks up where it held, so nothing is skipped.
+        rest = np.concatenate(rest)
+        np.testing.assert_allclose(rest[:len(data) - ready], data[ready:] * PLAYBACK_GAIN, rtol=1e-6, atol=1e-7)
+    finally:
+        gate.set()
+        cache.pool.shutdown(wait=True)
@@ -0,0 +1,117 @@
+from collections import deque
+from time import perf_counter
+import os
+import time
+
+import numpy as np
+
+from dsp import VoicePool
+from effects import build_chain
+from metrics import XRUN_TYPES
+from processor import BLOCK_SIZES, MAX_VOICES, OUTPUT_LIMIT, PROCESS_DTYPE, SAMPLE_RATE
+
+AUTO_BLOCK = os.environ.get("AUDIOCART_AUTO_BLOCK", "0") == "1"
+TUNE_MARGIN = float(os.environ.get("AUDIOCART_TUNE_MARGIN", "0.5"))
+TUNE_BLOCKS = 48
+XRUN_WINDOW = 10.0
+XRUN_LIMIT = 3
+BACKOFF_XRUNS = ("input_overflow", "output_underflow")
+
+
+def measure_chain(spec, block_size, voices=0, blocks=TUNE_BLOCKS):
+    # p99 time of one block through a fresh copy of the chain, with `voices` soundpad voices mixed in.
+    chain = build_chain("tune", spec, SAMPLE_RATE, PROCESS_DTYPE)
+    chain.prepare(block_size)
+    rng = np.random.default_rng(0)
+    source = (0.1 * rng.standard_normal(block_size * 4)).astype(np.float32)
+    pool = VoicePool(MAX_VOICES, block_size)
+    for _ in range(voices):
+        pool.play(source, gain=0.7, loop=True)
+    x = np.zeros(block_size, dtype=PROCESS_DTYPE)
+    pad = np.zeros(block_size, dtype=np.float32)
+    times = np.empty(blocks)
+    for i in range(blocks + 4):
+        offset = (i % 4) * block_size
+        started = perf_counter()
+        x[:] = source[offset:offset + block_size]
+        chain.process(x)
+        pad.fill(0)
+        pool.mix(pad)
+        x += pad
+        np.clip(x, -OUTPUT_LIMIT, OUTPUT_LIMIT, out=x)
+        if i >= 4:
+            times[i - 4] = perf_counter() - started
+    return float(np.percentile(times, 99))
+
+
+class BlockTuner:
+    # Picks the smallest block size whose measured processing time for the active chain stays
+    # within `margin` of the block budget, and steps one size up when xruns keep coming.
+    def __init__(self, processor, metrics, margin=TUNE_MARGIN):
+        self.processor = processor
+        self.metrics = metrics
+        self.margin = margin
+        self.enabled = AUTO_BLOCK
+        self.floor = BLOCK_SIZES[0]
+        self.measured = {}
+        self.tuned_effect = None
+        self.xrun_times = deque()
+        self.last_xruns = 0
+        self.backoffs = 0
+
+    def reset(self):
+        self.floor = BLOCK_SIZES[0]
+        self.xrun_times.clear()
+        self.last_xruns = self._xruns()
+
+    def _xruns(self):
+        return sum(self.metrics.xruns[XRUN_TYPES.index(name)] for name in BACKOFF_XRUNS)
+
+    def tune(self) -> int:
+        processor = self.processor
+        spec = processor.chain_specs[processor.effect]
+        voices = processor.voices.active_count()
+        self.measured = {}
+        chosen = BLOCK_SIZES[-1]
+        for block_size in BLOCK_SIZES:
+            if block_size < self.floor:
+                continue
+            seconds = measure_chain(spec, block_size, voices)
+            self.measured[block_size] = seconds
+            if seconds <= block_size / SAMPLE_RATE * self.margin:
+                chosen = block_size
+                break
+        self.tuned_effect = processor.effect
+        return chosen
+
+    def check(self, block_size):
+        # Called a few times a second off the audio thread; returns a new block size or None.
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        xruns = self._xruns()
+        for _ in range(min(xruns - self.last_xruns, XRUN_LIMIT)):
+            self.xrun_times.append(now)
+        self.last_xruns = xruns
+        while self.xrun_times and now - self.xrun_times[0] > XRUN_WINDOW:
+            self.xrun_times.popleft()
+        if len(self.xrun_times) >= XRUN_LIMIT and block_size < BLOCK_SIZES[-1]:
+            self.floor = BLOCK_SIZES[BLOCK_SIZES.index(block_size) + 1] if block_size in BLOCK_SIZES else block_size * 2
+            self.xrun_times.clear()
+            self.backoffs += 1
+            print(f"[Tuning] {XRUN_LIMIT} xruns in {XRUN_WINDOW:.0f}s at {block_size} samples, backing off to {self.floor}")
+            return self.floor
+        if self.processor.effect != self.tuned_effect:
+            chosen = self.tune()
+            return chosen if chosen != block_size else None
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "margin": self.margin,
+            "floor": self.floor,
+            "backoffs": self.backoffs,
+            "effect": self.tuned_effect,
+            "measured_ms": {str(size): round(seconds * 1000, 4) for size, seconds in self.measured.items()}
+        }